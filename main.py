@@ -1,15 +1,24 @@
 # main.py
+import os
 import streamlit as st
-import pandas as pd
-import plotly.figure_factory as ff
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from config import USERS
-from utils.data_handler import DataHandler
+from utils.data_handler import ChecklistItem, DataHandler, Task
+from utils.task_collection import TaskCollection
+from utils import figure_cache, task_cache
+from utils.detail_view import predecessor_options, show_checklist_panel, show_task_panel
+from utils.aggregates import STATUSES
+from utils.write_behind import WriteBehind
+
+@st.cache_resource(show_spinner=False)
+def get_data_handler():
+    """行程內共用的數據處理器（每次重跑都會執行此檔，處理器只建立一次）"""
+    return DataHandler(journal=True, snapshot=True)
+
 
 # 初始化數據處理器
-data_handler = DataHandler()
+data_handler = get_data_handler()
 
 # 設置頁面配置
 st.set_page_config(
@@ -19,159 +28,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 添加自定義 CSS
-st.markdown("""
-    <style>
-    /* 整體應用樣式 */
-    .stApp {
-        background-color: #1E1E1E;
-    }
-    
-    /* 標題樣式 */
-    h1 {
-        background: linear-gradient(45deg, #2C3E50, #3498DB);
-        color: white !important;
-        padding: 20px;
-        border-radius: 10px;
-        margin-bottom: 30px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.3);
-    }
-    
-    /* 卡片樣式 */
-    .metric-card {
-        background: #2D2D2D;
-        border-radius: 15px;
-        padding: 20px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        transition: transform 0.3s ease;
-    }
-    .metric-card:hover {
-        transform: translateY(-5px);
-    }
-    .metric-value {
-        font-size: 28px;
-        font-weight: bold;
-        background: linear-gradient(45deg, #2C3E50, #3498DB);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        margin-bottom: 5px;
-    }
-    .metric-label {
-        color: #CCCCCC;
-        font-size: 16px;
-        font-weight: 500;
-    }
-    
-    /* 任務列表樣式 */
-    .task-row {
-        background: #2D2D2D;
-        padding: 20px;
-        border-radius: 15px;
-        margin-bottom: 15px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        transition: transform 0.2s ease;
-    }
-    .task-row:hover {
-        transform: scale(1.01);
-    }
-    .task-title {
-        font-size: 18px;
-        font-weight: 600;
-        color: #3498DB;
-        margin-bottom: 10px;
-    }
-    .task-info {
-        color: #CCCCCC;
-        font-size: 14px;
-    }
-    .task-status {
-        padding: 5px 10px;
-        border-radius: 20px;
-        font-size: 12px;
-        font-weight: 500;
-    }
-    .status-pending {
-        background-color: #2C3E50;
-        color: #FFF;
-    }
-    .status-progress {
-        background-color: #2980B9;
-        color: #FFF;
-    }
-    .status-completed {
-        background-color: #27AE60;
-        color: #FFF;
-    }
-    
-    /* 任務按鈕樣式 */
-    .stButton > button {
-        background: linear-gradient(45deg, #2C3E50, #3498DB);
-        color: white;
-        border: none;
-        padding: 8px 16px;
-        border-radius: 20px;
-        font-weight: 500;
-        transition: all 0.3s ease;
-        width: 100%;
-        margin: 5px 0;
-    }
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 15px rgba(0,0,0,0.3);
-    }
-    
-    /* 側邊欄樣式 */
-    .css-1d391kg {
-        background: linear-gradient(180deg, #2C3E50, #3498DB);
-    }
-    .css-1d391kg .stButton > button {
-        background: #2D2D2D;
-        color: #3498DB;
-    }
-    
-    /* 進度條容器 */
-    .progress-container {
-        margin-top: 10px;
-        background: #2D2D2D;
-        border-radius: 10px;
-        height: 6px;
-        overflow: hidden;
-    }
-    
-    /* 進度條 */
-    .progress-bar {
-        height: 100%;
-        background: linear-gradient(45deg, #2C3E50, #3498DB);
-        border-radius: 10px;
-        transition: width 0.3s ease;
-    }
-    
-    /* 進度條樣式 */
-    .stProgress > div > div {
-        background-color: #3498DB;
-    }
 
-    /* 輸入框樣式 */
-    .stTextInput > div > div > input {
-        background-color: #2D2D2D;
-        color: white;
-        border-color: #3D3D3D;
-    }
-    
-    /* 下拉選單樣式 */
-    .stSelectbox > div > div {
-        background-color: #2D2D2D;
-        color: white;
-    }
-    
-    /* 文本區域樣式 */
-    .stTextArea textarea {
-        background-color: #2D2D2D;
-        color: white;
-        border-color: #3D3D3D;
-    }
-    </style>
-""", unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False)
+def load_style():
+    """自定義 CSS（每次重跑都會執行此檔，檔案在行程內只讀取一次）
+
+    Streamlit 的靜態檔案一律以 text/plain 回應，瀏覽器不會當作樣式表
+    套用，因此內嵌為 <style>。
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'style.css')
+    with open(path, 'r', encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+st.markdown(load_style(), unsafe_allow_html=True)
 
 # 初始化 session state
 
@@ -182,91 +52,205 @@ if 'username' not in st.session_state:
     st.session_state.username = None
 if 'role' not in st.session_state:
     st.session_state.role = None
-if 'tasks' not in st.session_state:
-    st.session_state.tasks = data_handler.load_tasks()
 if 'current_view' not in st.session_state:
     st.session_state.current_view = 'main'
 if 'current_task' not in st.session_state:
     st.session_state.current_task = None
     
-def show_task_table():
-    for task in st.session_state.tasks:
-        status_class = get_status_class(task['Status'])
-        progress = calculate_progress(task)
-        
-        # 使用HTML美化外觀，但保留Streamlit按鈕功能
-        st.markdown(f"""
+TASK_SORT_KEYS = {
+    "預設順序": None,
+    "開始日期": lambda t: t.start,
+    "結束日期": lambda t: t.finish,
+    "任務名稱": lambda t: t.name,
+    "任務狀態": lambda t: t.status,
+}
+
+
+@lru_cache(maxsize=4096)
+def render_task_row(name, start, finish, status):
+    """任務列 HTML，以任務內容為鍵快取"""
+    status_class = get_status_class(status)
+    return f"""
             <div class="task-row">
                 <div style="display: flex; justify-content: space-between; align-items: center;">
                     <div style="flex-grow: 1;">
-                        <div class="task-title">{task['Task']}</div>
+                        <div class="task-title">{name}</div>
                         <div class="task-info">
-                            <span>開始: {task['Start']}</span> | 
-                            <span>結束: {task['Finish']}</span> | 
-                            <span class="task-status {status_class}">{task['Status']}</span>
+                            <span>開始: {start}</span> | 
+                            <span>結束: {finish}</span> | 
+                            <span class="task-status {status_class}">{status}</span>
                         </div>
                     </div>
                 </div>
             </div>
-        """, unsafe_allow_html=True)
+        """
+
+
+@lru_cache(maxsize=1024)
+def render_progress(completed, total):
+    """進度條 HTML，以完成數/總數為鍵快取"""
+    if not total:
+        return """
+                    <div style="text-align: right; font-size: 12px; color: #666;">
+                        進度: 0%
+                    </div>
+                """
+    progress = (completed / total) * 100
+    return f"""
+                    <div style="margin-top: 10px;">
+                        <div style="background: #eee; border-radius: 10px; height: 6px;">
+                            <div style="width: {progress}%; height: 100%; background: #2193b0; border-radius: 10px;"></div>
+                        </div>
+                        <div style="text-align: right; font-size: 12px; color: #666; margin-top: 5px;">
+                            進度: {progress:.1f}%
+                        </div>
+                    </div>
+                """
+
+
+def show_task_table(tasks):
+    # 列表控制：排序、每頁筆數
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        sort_by = st.selectbox("排序", list(TASK_SORT_KEYS), key="table_sort")
+    with col2:
+        page_size = st.selectbox("每頁", [10, 25, 50, 100], key="table_page_size")
+
+    if TASK_SORT_KEYS[sort_by] is not None:
+        tasks = sorted(tasks, key=TASK_SORT_KEYS[sort_by])
+    elif not isinstance(tasks, list):
+        tasks = tasks.to_list()
+
+    page_count = max(1, -(-len(tasks) // page_size))
+    page = st.number_input(f"頁碼（共 {page_count} 頁，{len(tasks)} 筆）", min_value=1, max_value=page_count, value=1, key="table_page")
+    page = min(page, page_count)
+
+    # 只渲染目前頁面的任務
+    for task in tasks[(page - 1) * page_size:page * page_size]:
+        # 使用HTML美化外觀，但保留Streamlit按鈕功能
+        st.markdown(render_task_row(task.name, task.start, task.finish, task.status), unsafe_allow_html=True)
         
         # 保留原有的功能性按鈕，但使用更漂亮的樣式
         col1, col2 = st.columns([2, 8])
         with col1:
-            if st.button(f"📋 查看詳情", key=f"task_{task['id']}", help="點擊查看任務詳情"):
+            if st.button(f"📋 查看詳情", key=f"task_{task.id}", help="點擊查看任務詳情"):
                 st.session_state.current_task = task
                 st.session_state.current_view = 'detail'
                 st.rerun()
         
         # 顯示進度條
         with col2:
-            if task['Checklist']:
-                completed = sum(1 for item in task['Checklist'] if item['completed'])
-                total = len(task['Checklist'])
-                progress = (completed / total) * 100
-                st.markdown(f"""
-                    <div style="margin-top: 10px;">
-                        <div style="background: #eee; border-radius: 10px; height: 6px;">
-                            <div style="width: {progress}%; height: 100%; background: #2193b0; border-radius: 10px;"></div>
-                        </div>
-                        <div style="text-align: right; font-size: 12px; color: #666; margin-top: 5px;">
-                            進度: {progress:.1f}%
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""
-                    <div style="text-align: right; font-size: 12px; color: #666;">
-                        進度: 0%
-                    </div>
-                """, unsafe_allow_html=True)
+            checklist = task.checklist
+            completed = sum(1 for item in checklist if item.completed)
+            st.markdown(render_progress(completed, len(checklist)), unsafe_allow_html=True)
         
         st.markdown("<hr style='margin: 10px 0; border: none; border-top: 1px solid #eee;'>", unsafe_allow_html=True)
         
-def show_charts():
+# 圖表配色；主題名稱是共用圖表快取鍵的一部分
+CHART_THEMES = {
+    'dark': {'background': '#2D2D2D', 'font': 'white', 'grid': '#444444'},
+}
+CHART_THEME = 'dark'
+
+
+def chart_figure(name, view, build):
+    """訪客共用同一份任務時，圖表依 (數據版本, 篩選條件, 主題) 跨 session 快取
+
+    管理員的任務可能含有尚未保存的修改，圖表直接建立。
+    """
+    if isinstance(st.session_state.tasks, task_cache.SessionTasks):
+        return build()
+    return figure_cache.get_figure(data_handler, st.session_state.tasks_version, name,
+                                   (view, CHART_THEME), build)
+
+
+def build_status_pie(stats, theme):
+    import plotly.graph_objects as go
+
+    if not stats.total:
+        return None
+    status_counts = stats.status_counts.most_common()
+    fig = go.Figure(data=[go.Pie(
+        labels=[status for status, _ in status_counts],
+        values=[count for _, count in status_counts],
+        hole=0.3,
+        marker=dict(colors=['rgb(220, 0, 0)', 'rgb(255, 165, 0)', 'rgb(0, 255, 0)']),
+    )])
+    fig.update_layout(
+        showlegend=True,
+        height=400,
+        annotations=[dict(text='狀態', x=0.5, y=0.5, font_size=20, showarrow=False)],
+        paper_bgcolor=theme['background'],
+        plot_bgcolor=theme['background'],
+        font=dict(color=theme['font'])
+    )
+    return fig
+
+
+def build_category_pie(stats, theme):
+    import plotly.express as px
+
+    if not stats.total:
+        return None
+    category_counts = [(c, n) for c, n in stats.category_counts.most_common() if c is not None]
+    fig = px.pie(
+        values=[count for _, count in category_counts],
+        names=[category for category, _ in category_counts],
+        hole=0.3,
+    )
+    fig.update_layout(
+        showlegend=True,
+        height=400,
+        annotations=[dict(text='類別', x=0.5, y=0.5, font_size=20, showarrow=False)],
+        paper_bgcolor=theme['background'],
+        plot_bgcolor=theme['background'],
+        font=dict(color=theme['font'])
+    )
+    return fig
+
+
+def build_task_gantt(tasks, window, theme, critical=None, calendar=None):
+    from utils.gantt import build_gantt
+    from utils.task_frame import task_frame
+
+    colors = {
+        '未開始': 'rgb(220, 0, 0)',
+        '進行中': 'rgb(255, 165, 0)',
+        '已完成': 'rgb(0, 255, 0)'
+    }
+    df = task_frame(tasks)
+    if df.empty:
+        return None
+    fig = build_gantt(df, colors, window=window, critical=critical, calendar=calendar)
+    axis = dict(gridcolor=theme['grid'], tickcolor=theme['font'], tickfont=dict(color=theme['font']))
+    fig.update_layout(
+        title='項目進度甘特圖',
+        xaxis_title='日期',
+        yaxis_title='任務',
+        font=dict(size=10, color=theme['font']),
+        showlegend=True,
+        paper_bgcolor=theme['background'],
+        plot_bgcolor=theme['background'],
+        xaxis=axis,
+        yaxis=axis,
+    )
+    return fig
+
+
+def show_charts(tasks, window=None, view=None):
+    # 圓餅圖直接讀取增量統計，甘特圖使用依數據版本快取的 DataFrame；
+    # view 為產生此任務子集合的篩選條件，作為共用圖表快取的鍵
+    stats = tasks.aggregates
+    theme = CHART_THEMES[CHART_THEME]
+
     # 創建兩列布局用於顯示圓餅圖
     col1, col2 = st.columns(2)
 
     # 第一列：狀態分佈圓餅圖
     with col1:
         st.subheader("任務狀態分佈")
-        df_status = pd.DataFrame(st.session_state.tasks)
-        if not df_status.empty:
-            status_counts = df_status['Status'].value_counts()
-            fig_status = go.Figure(data=[go.Pie(
-                labels=status_counts.index,
-                values=status_counts.values,
-                hole=0.3,
-                marker=dict(colors=['rgb(220, 0, 0)', 'rgb(255, 165, 0)', 'rgb(0, 255, 0)']),
-            )])
-            fig_status.update_layout(
-                showlegend=True,
-                height=400,
-                annotations=[dict(text='狀態', x=0.5, y=0.5, font_size=20, showarrow=False)],
-                paper_bgcolor='#2D2D2D',  # 添加這行
-                plot_bgcolor='#2D2D2D',   # 添加這行
-                font=dict(color='white')   # 添加這行
-            )
+        fig_status = chart_figure('status_pie', view, lambda: build_status_pie(stats, theme))
+        if fig_status is not None:
             st.plotly_chart(fig_status, use_container_width=True)
         else:
             st.info("暫無數據")
@@ -274,65 +258,20 @@ def show_charts():
     # 第二列：類別分佈圓餅圖
     with col2:
         st.subheader("任務類別分佈")
-        df_category = pd.DataFrame(st.session_state.tasks)
-        if not df_category.empty:
-            category_counts = df_category['Category'].value_counts()
-            fig_category = px.pie(
-                values=category_counts.values,
-                names=category_counts.index,
-                hole=0.3,
-            )
-            fig_category.update_layout(
-                showlegend=True,
-                height=400,
-                annotations=[dict(text='類別', x=0.5, y=0.5, font_size=20, showarrow=False)],
-                paper_bgcolor='#2D2D2D',  # 添加這行
-                plot_bgcolor='#2D2D2D',   # 添加這行
-                font=dict(color='white')   # 添加這行
-            )
+        fig_category = chart_figure('category_pie', view, lambda: build_category_pie(stats, theme))
+        if fig_category is not None:
             st.plotly_chart(fig_category, use_container_width=True)
         else:
             st.info("暫無數據")
 
     # 創建甘特圖
     st.header("甘特圖")
-    colors = {
-        '未開始': 'rgb(220, 0, 0)',
-        '進行中': 'rgb(255, 165, 0)',
-        '已完成': 'rgb(0, 255, 0)'
-    }
-
-    df_gantt = pd.DataFrame(st.session_state.tasks)[['Task', 'Start', 'Finish', 'Status']]
-    if not df_gantt.empty:
-        fig = ff.create_gantt(
-            df_gantt,
-            colors=colors,
-            index_col='Status',
-            show_colorbar=True,
-            group_tasks=True,
-            showgrid_x=True,
-            showgrid_y=True,
-        )
-        fig.update_layout(
-            title='項目進度甘特圖',
-            xaxis_title='日期',
-            yaxis_title='任務',
-            height=400 + (len(df_gantt) * 30),
-            font=dict(size=10, color='white'),  # 修改這行
-            showlegend=True,
-            paper_bgcolor='#2D2D2D',  # 添加這行
-            plot_bgcolor='#2D2D2D',   # 添加這行
-            xaxis=dict(  # 添加這部分
-                gridcolor='#444444',
-                tickcolor='white',
-                tickfont=dict(color='white')
-            ),
-            yaxis=dict(  # 添加這部分
-                gridcolor='#444444',
-                tickcolor='white',
-                tickfont=dict(color='white')
-            )
-        )
+    # 要徑依整個專案的前置任務連結計算，篩選後只標示顯示中的任務；
+    # 提示文字含工作天數，日曆內容也是快取鍵的一部分
+    calendar = st.session_state.calendar
+    fig = chart_figure('gantt', (view, calendar.key), lambda: build_task_gantt(
+        tasks, window, theme, critical=st.session_state.tasks.schedule.critical(), calendar=calendar))
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("暫無任務數據")
@@ -351,57 +290,132 @@ def show_main_view():
     st.title("專案進度追蹤")
     
     if st.session_state.tasks:
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{len(st.session_state.tasks)}</div>
-                    <div class="metric-label">總任務數</div>
-                </div>
-            """, unsafe_allow_html=True)
-        
+        window = show_date_filter()
+        query = st.text_input("🔍 搜尋任務", placeholder="任務名稱、注意事項或檢查項目", key="task_search").strip()
+        filters = show_facet_filters()
+        tasks = windowed_tasks(window)
+        if query:
+            tasks = searched_tasks(tasks, query)
+        if any(filters.values()):
+            tasks = faceted_tasks(tasks, filters)
+        show_metrics(tasks)
+        show_task_table(tasks)
+        view = (window, query, tuple(tuple(values) for values in filters.values()))
+        show_charts(tasks, window, view)
+
+
+DATE_WINDOWS = ["全部期間", "本週", "本月", "自訂區間"]
+
+
+def show_date_filter():
+    """日期區間篩選，回傳 (開始, 結束) 或 None（全部期間）"""
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        choice = st.selectbox("日期區間", DATE_WINDOWS, key="date_window")
+    today = datetime.now().date()
+    if choice == "本週":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=6)
+    if choice == "本月":
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return start, end
+    if choice == "自訂區間":
         with col2:
-            completed_tasks = len([t for t in st.session_state.tasks if t['Status'] == '已完成'])
-            st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{completed_tasks}</div>
-                    <div class="metric-label">已完成任務</div>
-                </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            in_progress = len([t for t in st.session_state.tasks if t['Status'] == '進行中'])
-            st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{in_progress}</div>
-                    <div class="metric-label">進行中任務</div>
-                </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            completion_rate = (completed_tasks / len(st.session_state.tasks) * 100) if st.session_state.tasks else 0
-            st.markdown(f"""
-                <div class="metric-card">
-                    <div class="metric-value">{completion_rate:.1f}%</div>
-                    <div class="metric-label">完成率</div>
-                </div>
-            """, unsafe_allow_html=True)
-        
-        show_task_table()
-        show_charts()
+            selected = st.date_input("選擇區間", value=(today, today + timedelta(days=30)), key="date_range")
+        # 只選了開始日期時先不篩選
+        if isinstance(selected, (list, tuple)) and len(selected) == 2:
+            return tuple(selected)
+    return None
+
+
+def derived_tasks(name, sources, key, build):
+    """由任務集合衍生的子集合，快取在 session 中
+
+    sources 為衍生所依據的集合，保存在快取中並以 is 比對（集合被回收
+    後 id() 可能由新集合沿用，不能只比對 id()）；key 為集合版本與篩選
+    條件。
+    """
+    cached = st.session_state.get(name)
+    if cached is None or cached[1] != key or any(old is not new for old, new in zip(cached[0], sources)):
+        cached = (sources, key, TaskCollection(build()))
+        st.session_state[name] = cached
+    return cached[2]
+
+
+def windowed_tasks(window):
+    """與日期區間重疊的任務集合（以區間索引查詢）"""
+    tasks = st.session_state.tasks
+    if window is None:
+        return tasks
+    return derived_tasks('window_tasks', (tasks,), (tasks.version, window),
+                         lambda: tasks.overlapping(*window))
+
+
+def searched_tasks(tasks, query):
+    """全文搜尋結果（依相關度排序），限定在目前的任務集合內"""
+    source = st.session_state.tasks
+    return derived_tasks('search_tasks', (source, tasks), (source.version, tasks.version, query),
+                         lambda: [task for task in source.search(query) if task.id in tasks])
+
+
+FACET_LABELS = {'status': "任務狀態", 'category': "任務類別", 'created_by': "建立者"}
+
+
+def show_facet_filters():
+    """狀態/類別/建立者篩選，選項附上其他條件下的任務數"""
+    facets = st.session_state.tasks.facets
+    filters = {facet: st.session_state.get(f"facet_{facet}", []) for facet in FACET_LABELS}
+    for column, (facet, label) in zip(st.columns(len(FACET_LABELS)), FACET_LABELS.items()):
+        counts = facets.counts(facet, filters)
+        # 已選的值即使目前沒有任務也要保留在選項中
+        options = [value for value in counts if value is not None]
+        options += [value for value in filters[facet] if value not in counts]
+        if facet == 'status':
+            options.sort(key=lambda value: (STATUSES.index(value) if value in STATUSES else len(STATUSES), value))
+        else:
+            options.sort()
+        with column:
+            filters[facet] = st.multiselect(
+                label, options, key=f"facet_{facet}",
+                format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})",
+            )
+    return filters
+
+
+def faceted_tasks(tasks, filters):
+    """依篩選遮罩取出任務，限定在目前的任務集合內"""
+    source = st.session_state.tasks
+    key = (source.version, tasks.version, tuple(tuple(values) for values in filters.values()))
+    if tasks is source:
+        return derived_tasks('facet_tasks', (source, tasks), key, lambda: source.select(filters))
+
+    def build():
+        selected = set(source.facets.select(filters))
+        return [task for task in tasks if task.id in selected]
+
+    return derived_tasks('facet_tasks', (source, tasks), key, build)
+
+
+def show_metrics(tasks):
+    # 工作日曆需要 numpy，登入頁不載入
+    from utils.work_calendar import plan_progress
+
+    stats = tasks.aggregates
+    total_tasks = stats.total
+    completed_tasks = stats.count('已完成')
+    in_progress = stats.count('進行中')
 
-def show_metrics():
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.markdown(f"""
             <div class="metric-card">
-                <div class="metric-value">{len(st.session_state.tasks)}</div>
+                <div class="metric-value">{total_tasks}</div>
                 <div class="metric-label">總任務數</div>
             </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        completed_tasks = len([t for t in st.session_state.tasks if t['Status'] == '已完成'])
         st.markdown(f"""
             <div class="metric-card">
                 <div class="metric-value">{completed_tasks}</div>
@@ -410,7 +424,6 @@ def show_metrics():
         """, unsafe_allow_html=True)
     
     with col3:
-        in_progress = len([t for t in st.session_state.tasks if t['Status'] == '進行中'])
         st.markdown(f"""
             <div class="metric-card">
                 <div class="metric-value">{in_progress}</div>
@@ -419,7 +432,7 @@ def show_metrics():
         """, unsafe_allow_html=True)
     
     with col4:
-        completion_rate = (completed_tasks / len(st.session_state.tasks) * 100) if st.session_state.tasks else 0
+        completion_rate = stats.completion_rate()
         st.markdown(f"""
             <div class="metric-card">
                 <div class="metric-value">{completion_rate:.1f}%</div>
@@ -427,6 +440,13 @@ def show_metrics():
             </div>
         """, unsafe_allow_html=True)
 
+    if stats.checklist_total:
+        st.caption(f"檢查項目完成: {stats.checklist_done}/{stats.checklist_total} ({stats.checklist_rate():.1f}%)")
+
+    # 依工作日曆計算的計畫進度，與實際完成率對照
+    planned, remaining = plan_progress(tasks, st.session_state.calendar, datetime.now().date())
+    st.caption(f"計畫進度（依工作天）: {planned:.1f}%｜距完工尚有 {remaining} 個工作天")
+
 
 def show_detail_view():
     current_task = st.session_state.current_task
@@ -437,119 +457,17 @@ def show_detail_view():
         st.session_state.current_task = None
         st.rerun()
 
-    st.title(f"任務詳情: {current_task['Task']}")
-    
-    col1, col2, col3 = st.columns([1, 1, 1])
-    
-    with col1:
-        st.subheader("基本信息")
-        st.write(f"**開始日期:** {current_task['Start']}")
-        st.write(f"**結束日期:** {current_task['Finish']}")
-        st.write(f"**任務類別:** {current_task['Category']}")
-        
-        if st.session_state.role == "admin":
-            new_status = st.selectbox(
-                "當前狀態",
-                ["未開始", "進行中", "已完成"],
-                index=["未開始", "進行中", "已完成"].index(current_task['Status']),
-                key="status_select"
-            )
-            if new_status != current_task['Status']:
-                for task in st.session_state.tasks:
-                    if task['id'] == current_task['id']:
-                        task['Status'] = new_status
-                        current_task['Status'] = new_status
-                        st.success("狀態更新成功！")
-                        st.rerun()
-        else:
-            st.write(f"**當前狀態:** {current_task['Status']}")
-    
-    with col2:
-        st.subheader("注意事項")
-        if st.session_state.role == "admin":
-            notes = st.text_area(
-                "編輯注意事項",
-                value=current_task.get('Notes', ''),
-                height=200,
-                key="notes_area"
-            )
-            if notes != current_task.get('Notes', ''):
-                for task in st.session_state.tasks:
-                    if task['id'] == current_task['id']:
-                        task['Notes'] = notes
-                        current_task['Notes'] = notes
-        else:
-            st.write(current_task.get('Notes', '無注意事項'))
-    
-    with col3:
-        st.subheader("任務進度")
-        if current_task.get('Checklist'):
-            completed = sum(1 for item in current_task['Checklist'] if item['completed'])
-            total = len(current_task['Checklist'])
-            progress = (completed / total) * 100
-            st.progress(progress / 100)
-            st.write(f"完成進度: {progress:.1f}%")
-            
-            st.write(f"總項目數: {total}")
-            st.write(f"已完成項目: {completed}")
-            st.write(f"待完成項目: {total - completed}")
-        else:
-            st.write("尚未添加檢查項目")
-    
-    # 檢查清單
-    st.header("檢查項目列表")
-    if 'Checklist' in current_task and current_task['Checklist']:
-        for i, item in enumerate(current_task['Checklist']):
-            col1, col2, col3 = st.columns([0.1, 1, 0.1])
-            with col1:
-                if st.session_state.role == "admin":
-                    checked = st.checkbox(
-                        label=f"項目 {i+1}",
-                        value=item['completed'],
-                        key=f"check_{i}",
-                        label_visibility="collapsed"
-                    )
-                    if checked != item['completed']:
-                        for task in st.session_state.tasks:
-                            if task['id'] == current_task['id']:
-                                task['Checklist'][i]['completed'] = checked
-                                current_task['Checklist'][i]['completed'] = checked
-                                st.rerun()
-                else:
-                    st.write("✓" if item['completed'] else "○")
-            
-            with col2:
-                st.write(item['item'])
-            
-            with col3:
-                if st.session_state.role == "admin" and st.button("刪除", key=f"delete_{i}"):
-                    for task in st.session_state.tasks:
-                        if task['id'] == current_task['id']:
-                            task['Checklist'].pop(i)
-                            current_task['Checklist'].pop(i)
-                            st.rerun()
-    
-    # 添加新的檢查項目
-    if st.session_state.role == "admin":
-        st.subheader("添加新檢查項目")
-        new_item = st.text_input("新檢查項目", key="new_item")
-        if st.button("添加項目", type="primary") and new_item:
-            for task in st.session_state.tasks:
-                if task['id'] == current_task['id']:
-                    if 'Checklist' not in task:
-                        task['Checklist'] = []
-                    task['Checklist'].append({
-                        "item": new_item,
-                        "completed": False
-                    })
-                    current_task['Checklist'] = task['Checklist']
-                    st.success("新檢查項目添加成功！")
-                    st.rerun()
-                    
+    st.title(f"任務詳情: {current_task.name}")
+
+    # 基本信息與檢查項目各自為片段，互動時只重跑所在片段
+    show_task_panel(current_task.id)
+    show_checklist_panel(current_task.id)
+
+
 def calculate_progress(task):
-    if task['Checklist']:
-        completed = sum(1 for item in task['Checklist'] if item['completed'])
-        return (completed / len(task['Checklist'])) * 100
+    if task.checklist:
+        completed = sum(1 for item in task.checklist if item.completed)
+        return (completed / len(task.checklist)) * 100
     return 0
 
 
@@ -582,11 +500,57 @@ def login():
         return False
     return True
 
+def sync_tasks():
+    """依變更通知同步任務：訪客直接共用任務快取，管理員持有寫入時複製的副本"""
+    shared, version = task_cache.get_tasks(data_handler)
+    if 'tasks' not in st.session_state:
+        # 登入後才載入任務：共用行程層級的任務快取，新 session 不必重新解析數據檔
+        st.session_state.tasks, st.session_state.tasks_version = shared, version
+    if st.session_state.role == "admin":
+        writer = st.session_state.get('write_behind')
+        if not isinstance(st.session_state.tasks, task_cache.SessionTasks):
+            st.session_state.tasks = task_cache.SessionTasks(st.session_state.tasks)
+        elif version != st.session_state.tasks_version:
+            changed = data_handler.changes_since(st.session_state.tasks_version)
+            if changed is None:
+                # 無法增量同步時，先保存本地修改再整份換成最新內容
+                if writer is not None:
+                    writer.flush(force=True)
+                shared, version = task_cache.get_tasks(data_handler)
+                st.session_state.tasks = task_cache.SessionTasks(shared)
+            else:
+                st.session_state.tasks.apply_changes(shared, changed)
+        st.session_state.tasks_version = version
+
+        # 管理員的修改由寫入延遲層批次保存
+        if writer is None or writer.tasks is not st.session_state.tasks:
+            writer = st.session_state.write_behind = WriteBehind(data_handler, st.session_state.tasks)
+        writer.flush()
+        for message in writer.pop_conflicts():
+            st.warning(f"{message}，已載入最新內容")
+        if writer.error:
+            st.error(f"{writer.error}，修改尚未保存")
+    else:
+        st.session_state.tasks = shared
+        st.session_state.tasks_version = version
+
+    # 工作日曆檔案未變更時直接沿用
+    st.session_state.calendar = data_handler.load_calendar()
+
+    # 詳情頁顯示的任務換成同步後的物件
+    current_task = st.session_state.current_task
+    if current_task is not None and current_task.id in st.session_state.tasks:
+        st.session_state.current_task = st.session_state.tasks.get(current_task.id)
+
 def main():
+    sync_tasks()
+
     # 側邊欄
     with st.sidebar:
         st.write(f"當前用戶: {st.session_state.username}")
         if st.button("登出"):
+            if 'write_behind' in st.session_state:
+                st.session_state.write_behind.flush(force=True)
             st.session_state.logged_in = False
             st.session_state.username = None
             st.session_state.role = None
@@ -600,8 +564,28 @@ def main():
             checklist_text = st.text_area("檢查項目清單", key="new_checklist")
             start_date = st.date_input("開始日期", key="new_start")
             end_date = st.date_input("結束日期", key="new_end")
+            calendar = st.session_state.calendar
+            duration = st.number_input("工期（工作天，0 表示依結束日期）", min_value=0, step=1, key="new_duration")
+            if duration and start_date:
+                # 依工作日曆由開始日推算結束日期，跳過週末與假日
+                end_date = calendar.finish_dates(start_date, duration).astype(object)
+            if start_date and end_date and end_date >= start_date:
+                st.caption(f"結束日期 {end_date}，共 {int(calendar.working_days(start_date, end_date))} 個工作天")
             category = st.text_input("任務類別", key="new_category")
             status = st.selectbox("任務狀態", ["未開始", "進行中", "已完成"], key="new_status")
+            tasks = st.session_state.tasks
+            query = st.text_input("搜尋前置任務", key="new_predecessor_query",
+                                  placeholder="輸入名稱搜尋；未搜尋時列出開始日前 30 天內的任務").strip()
+            # 選項隨搜尋改變時 Streamlit 會重設選單，已選的任務另外保存並在每次重跑時帶回
+            selected = [p for p in st.session_state.get("new_predecessor_ids", []) if p in tasks]
+            st.session_state.new_predecessors = selected
+            predecessors = st.multiselect(
+                "前置任務",
+                predecessor_options(tasks, selected, query, start_date),
+                key="new_predecessors",
+                format_func=lambda task_id: tasks.get(task_id).name,
+                on_change=lambda: st.session_state.update(new_predecessor_ids=st.session_state.new_predecessors),
+            )
             notes = st.text_area("注意事項", key="new_notes")
             
             if st.button("添加任務", key="add_task_button"):
@@ -610,24 +594,25 @@ def main():
                         checklist = []
                         if checklist_text:
                             checklist = [
-                                {"item": item.strip(), "completed": False}
+                                ChecklistItem(item.strip())
                                 for item in checklist_text.split('\n')
                                 if item.strip()
                             ]
                         
-                        new_task = {
-                            'id': len(st.session_state.tasks),
-                            'Task': task_name,
-                            'Start': start_date,
-                            'Finish': end_date,
-                            'Category': category,
-                            'Status': status,
-                            'Notes': notes,
-                            'Checklist': checklist,
-                            'Created_by': st.session_state.username,
-                            'Created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
-                        st.session_state.tasks.append(new_task)
+                        new_task = Task(
+                            id=st.session_state.tasks.next_id(),
+                            name=task_name,
+                            start=start_date,
+                            finish=end_date,
+                            category=category,
+                            status=status,
+                            notes=notes,
+                            checklist=checklist,
+                            predecessors=predecessors,
+                            created_by=st.session_state.username,
+                            created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        )
+                        st.session_state.tasks.add(new_task)
                         st.success("任務添加成功！")
                         st.rerun()
                     else:
@@ -635,44 +620,120 @@ def main():
                 else:
                     st.warning("請填寫所有必要信息！")
 
+            show_calendar_editor()
+
     # 根據當前視圖顯示相應的內容
     if st.session_state.current_view == 'main':
         show_main_view()
     else:
         show_detail_view()
 
+    # 匯入會直接寫入數據檔，只開放給管理員
+    if st.session_state.role == "admin":
+        show_import()
+
+def show_calendar_editor():
+    """編輯專案工作日曆：每週工作日與假日（每行一個日期）"""
+    from utils.work_calendar import WEEKDAY_NAMES, WorkCalendar
+
+    calendar = st.session_state.calendar
+    with st.expander("工作日曆"):
+        with st.form("calendar_form"):
+            workdays = st.multiselect(
+                "每週工作日", WEEKDAY_NAMES,
+                default=[name for name, flag in zip(WEEKDAY_NAMES, calendar.weekmask) if flag == '1'],
+            )
+            holidays_text = st.text_area("假日（每行一個日期，如 2024-02-28）",
+                                         value="\n".join(day.isoformat() for day in calendar.holidays))
+            if st.form_submit_button("保存工作日曆"):
+                if not workdays:
+                    st.error("每週至少需要一個工作日！")
+                    return
+                try:
+                    holidays = [datetime.strptime(line.strip(), "%Y-%m-%d").date()
+                                for line in holidays_text.splitlines() if line.strip()]
+                except ValueError as e:
+                    st.error(f"假日日期格式錯誤: {e}")
+                    return
+                weekmask = ''.join('1' if name in workdays else '0' for name in WEEKDAY_NAMES)
+                data_handler.save_calendar(WorkCalendar(weekmask, holidays))
+                st.session_state.calendar = data_handler.load_calendar()
+                st.success("工作日曆已保存！")
+                st.rerun()
+
+
+def show_import():
     # CSV匯入功能
     st.header("導入現有數據")
-    uploaded_file = st.file_uploader("上傳CSV文件", type=['csv'])
-    if uploaded_file is not None:
+    uploaded_file = st.file_uploader("上傳CSV或Excel文件", type=['csv', 'xlsx'])
+    import_mode = st.radio("匯入方式", ["合併更新", "全部取代"], horizontal=True, key="import_mode")
+    if import_mode == "合併更新":
+        merge_key = st.multiselect("比對鍵（用來辨識同一任務的欄位）", ['Task', 'Category', 'Start'],
+                                   default=['Task'], key="merge_key")
+        delete_missing = st.checkbox("刪除匯入檔中不存在的任務", value=True, key="merge_delete")
+    with st.expander("Excel 匯入設定"):
+        sheet_name = st.text_input("工作表名稱（留空使用第一個）", key="excel_sheet")
+        st.caption("欄位對應：填入 Excel 表頭名稱，留空則自動辨識")
+        column_map = {}
+        for column, label in [('Task', '任務名稱'), ('Start', '開始日期'), ('Finish', '結束日期'),
+                              ('Category', '任務類別'), ('Status', '任務狀態'), ('Notes', '注意事項')]:
+            header = st.text_input(label, key=f"excel_map_{column}")
+            if header.strip():
+                column_map[column] = [header.strip()]
+    # 同一個檔案只匯入一次，避免重跑時重複匯入
+    if uploaded_file is not None and st.session_state.get('imported_file') != uploaded_file.file_id:
+        # 匯入才需要 pandas/openpyxl，上傳檔案時才載入
+        from utils.importer import import_chunks, iter_csv_chunks, iter_excel_chunks, merge_chunks
+
+        progress = st.progress(0.0, text="匯入中...")
+
+        def report(imported, chunk_errors):
+            done = min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+            progress.progress(done, text=f"已處理 {imported} 筆，本批 {len(chunk_errors)} 筆錯誤")
+
         try:
-            df = pd.read_csv(uploaded_file)
-            df['Start'] = pd.to_datetime(df['Start']).dt.date
-            df['Finish'] = pd.to_datetime(df['Finish']).dt.date
-            
-            tasks = []
-            for i, row in df.iterrows():
-                task = {
-                    'id': i,
-                    'Task': row['Task'],
-                    'Start': row['Start'],
-                    'Finish': row['Finish'],
-                    'Category': row['Category'],
-                    'Status': row['Status'],
-                    'Notes': row.get('Notes', ''),
-                    'Checklist': [],
-                    'Progress': 0,
-                    'Created_by': st.session_state.username,
-                    'Created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                tasks.append(task)
-            
+            if uploaded_file.name.lower().endswith('.xlsx'):
+                chunks = iter_excel_chunks(uploaded_file, column_map, sheet=sheet_name.strip() or None)
+            else:
+                chunks = iter_csv_chunks(uploaded_file)
+            if import_mode == "合併更新":
+                # 只套用有變更的任務，檢查項目與注意事項等資料保留
+                tasks = st.session_state.tasks
+                if not isinstance(tasks, task_cache.SessionTasks):
+                    tasks = task_cache.SessionTasks(tasks)
+                result = merge_chunks(chunks, tasks, st.session_state.username,
+                                      key=merge_key or ['Task'], delete_missing=delete_missing, on_progress=report)
+                # 合併結果整批保存一次（單次讀取與日誌追加），不經防抖逐筆寫入
+                writer = st.session_state.get('write_behind')
+                if writer is None or writer.tasks is not tasks:
+                    writer = st.session_state.write_behind = WriteBehind(data_handler, tasks)
+                writer.flush(force=True)
+            else:
+                replacement = TaskCollection()
+                result = import_chunks(chunks, replacement, st.session_state.username, report)
+                # 全部取代時整份寫入一次
+                data_handler.save_tasks(replacement)
+                tasks = task_cache.SessionTasks(replacement)
             st.session_state.tasks = tasks
-            st.success("數據導入成功！")
+            st.session_state.imported_file = uploaded_file.file_id
+            st.session_state.import_result = result
             st.rerun()
         except Exception as e:
             st.error(f"導入失敗：{str(e)}")
 
+    if 'import_result' in st.session_state:
+        imported, errors = st.session_state.pop('import_result')
+        if isinstance(imported, dict):
+            st.success(f"數據合併成功！新增 {imported['inserted']} 筆，更新 {imported['updated']} 筆，"
+                       f"刪除 {imported['deleted']} 筆，未變更 {imported['unchanged']} 筆")
+        else:
+            st.success(f"數據導入成功！共 {imported} 筆")
+        if errors:
+            st.warning(f"{len(errors)} 筆資料未匯入")
+            with st.expander("錯誤明細"):
+                for row, message in errors[:200]:
+                    st.write(f"第 {row} 列: {message}")
+
 # 運行應用
 if login():
     main()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 測試從專案根目錄匯入 utils 模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
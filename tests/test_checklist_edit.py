@@ -0,0 +1,81 @@
+# tests/test_checklist_edit.py
+import pyarrow as pa
+import pytest
+from streamlit.elements.lib.column_config_utils import determine_dataframe_schema
+from streamlit.elements.widgets.data_editor import _apply_dataframe_edits
+
+from utils.checklist_edit import ChecklistChanges
+from utils.data_handler import ChecklistItem, DataHandler, Task
+from utils.detail_view import checklist_frame, edited_rows
+from utils.snapshot import decode, encode
+from utils.sqlite_handler import SQLiteDataHandler
+from utils.task_collection import TaskCollection
+
+
+def _edit(checklist, state):
+    """以 Streamlit 表格編輯器套用編輯的方式產生送出的表格"""
+    frame = checklist_frame(checklist)
+    schema = determine_dataframe_schema(frame, pa.Schema.from_pandas(frame))
+    edited = frame.copy()
+    _apply_dataframe_edits(edited, state, schema)
+    return edited
+
+
+def test_added_deleted_and_reordered_rows():
+    """新增、刪除與調整順序一次送出，以項目 id 套用"""
+    checklist = [ChecklistItem('甲', False, 1), ChecklistItem('乙', True, 2), ChecklistItem('丙', False, 3)]
+    edited = _edit(checklist, {
+        'edited_rows': {0: {'順序': 3, '完成': True}, 2: {'順序': 1}},
+        'added_rows': [{'檢查項目': '丁'}],
+        'deleted_rows': [1],
+    })
+    rows = edited_rows(edited)
+    assert rows == [(3, '丙', False), (1, '甲', True), (None, '丁', False)]
+
+    changes = ChecklistChanges.diff(checklist, rows)
+    assert changes.deleted == {2}
+    assert changes.completed == {1: True}
+    assert changes.order == [3, 1]
+    assert changes.added == [('丁', False)]
+    result = changes.apply(checklist)
+    assert [(item.id, item.item, item.completed) for item in result] == [
+        (3, '丙', False), (1, '甲', True), (4, '丁', False)]
+
+
+def test_rows_added_to_empty_checklist():
+    edited = _edit([], {'added_rows': [{'檢查項目': '甲'}, {'檢查項目': ' ', '完成': True}]})
+    changes = ChecklistChanges.diff([], edited_rows(edited))
+    assert changes.added == [('甲', False)]
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_deleted_item_ids_are_not_reused(tmp_path, kind):
+    """刪除最後一個項目後新增的項目取得新的 id，其他 session 手上的舊 id 不會指到它"""
+    if kind == 'json':
+        handler = DataHandler(str(tmp_path / "data" / "tasks.json"), journal=True)
+    else:
+        handler = SQLiteDataHandler(str(tmp_path / "data" / "tasks.db"))
+    tasks = TaskCollection()
+    handler.add_task(tasks, Task(id=0, name='任務', start='2024-01-01', finish='2024-01-05',
+                                 checklist=[ChecklistItem('甲'), ChecklistItem('乙')]))
+    handler.update_checklist(tasks, 0, ChecklistChanges(deleted={2}))
+    handler.update_checklist(tasks, 0, ChecklistChanges(added=[('丙', False)]))
+    stored = handler.load_tasks().get(0)
+    assert [(item.id, item.item) for item in stored.checklist] == [(1, '甲'), (3, '丙')]
+    assert stored.next_item_id == 4
+
+    # 其他 session 仍以舊 id 2 修改時不會改到新項目
+    handler.update_checklist(tasks, 0, ChecklistChanges(texts={2: '改名'}, deleted={2}))
+    assert [(item.id, item.item) for item in handler.load_tasks().get(0).checklist] == [(1, '甲'), (3, '丙')]
+
+
+def test_item_counter_survives_copies_and_snapshots():
+    task = Task(id=0, name='任務', checklist=[ChecklistItem('甲')])
+    task.update(ChecklistChanges(deleted={1}).updates(task))
+    assert task.checklist == [] and task.next_item_id == 2
+    task.update(ChecklistChanges(added=[('乙', False)]).updates(task))
+    assert [item.id for item in task.checklist] == [2]
+    restored = Task.from_dict(task.to_dict())
+    assert restored.next_item_id == 3
+    (decoded,) = decode({name: value for name, value in encode([restored], (0, 0)).items()})
+    assert decoded.next_item_id == 3
@@ -0,0 +1,110 @@
+# tests/test_data_handler.py
+import json
+import os
+import threading
+
+import pytest
+
+from utils.data_handler import DataHandler, DataLoadError, Task
+from utils.task_cache import SessionTasks
+from utils.task_collection import TaskCollection
+from utils.write_behind import WriteBehind
+
+
+def _write_raw(handler, records):
+    with open(handler.file_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def broken(tmp_path):
+    """日期格式錯誤、無法解析的數據檔"""
+    handler = DataHandler(str(tmp_path / "data" / "tasks.json"), journal=True)
+    _write_raw(handler, [{'id': 0, 'Task': '舊任務', 'Start': '2024/01/03', 'Finish': '2024-01-05'}])
+    return handler
+
+
+def _contents(handler):
+    with open(handler.file_path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_write_refused_when_file_cannot_be_parsed(broken):
+    """無法解析時拒絕寫入，原檔案不變"""
+    before = _contents(broken)
+    assert len(broken.load_tasks()) == 0
+    with pytest.raises(DataLoadError):
+        broken.add_task(TaskCollection(), {'Task': '新任務', 'Start': '2024-01-01', 'Finish': '2024-01-02'})
+    with pytest.raises(DataLoadError):
+        broken.delete_task(TaskCollection(), 0)
+    assert _contents(broken) == before
+
+
+def test_write_behind_keeps_changes_until_file_is_fixed(broken):
+    """寫入延遲層保留未保存的變更，檔案修正後再寫入"""
+    tasks = SessionTasks()
+    writer = WriteBehind(broken, tasks)
+    tasks.add(Task.from_dict({'Task': '新任務', 'Start': '2024-01-01', 'Finish': '2024-01-02'}))
+    assert writer.flush(force=True) == 0
+    assert writer.error and writer.pending
+
+    _write_raw(broken, [{'id': 0, 'Task': '舊任務', 'Start': '2024-01-03', 'Finish': '2024-01-05'}])
+    assert writer.flush(force=True) == 1
+    assert writer.error is None and not writer.pending
+    assert sorted(task.name for task in broken.read_tasks()) == ['新任務', '舊任務']
+
+
+def test_compaction_writes_snapshot_without_holding_lock(tmp_path):
+    """背景壓縮寫入新快照期間，其他行程仍可寫入；壓縮後內容完整"""
+    path = str(tmp_path / "data" / "tasks.json")
+    handler = DataHandler(path, journal=True, snapshot=True, compact_threshold=1)
+    other = DataHandler(path, journal=True, snapshot=True)
+    written = []
+    stage = handler._stage
+
+    def stage_while_writing(snapshot):
+        writer = threading.Thread(target=lambda: written.append(
+            other.add_task(TaskCollection(), {'Task': '壓縮期間', 'Start': '2024-01-01', 'Finish': '2024-01-02'})))
+        writer.start()
+        writer.join(5)
+        assert not writer.is_alive(), "寫入快照時仍持有檔案鎖"
+        return stage(snapshot)
+
+    handler._stage = stage_while_writing
+    handler.add_task(TaskCollection(), {'Task': '第一筆', 'Start': '2024-01-01', 'Finish': '2024-01-02'})
+    handler._compactor.join(5)
+    assert written
+    assert not os.path.exists(path + ".journal.compacting")
+    names = sorted(task.name for task in DataHandler(path, journal=True, snapshot=True).read_tasks())
+    assert names == ['壓縮期間', '第一筆']
+
+
+@pytest.mark.parametrize('journal', [True, False])
+def test_failed_write_leaves_no_unsaved_changes_in_cache(tmp_path, journal, monkeypatch):
+    """寫入失敗（如磁碟已滿）時，快取中的集合不保留未保存的變更"""
+    handler = DataHandler(str(tmp_path / "data" / "tasks.json"), journal=journal)
+    tasks = TaskCollection()
+    handler.add_task(tasks, {'Task': '舊任務', 'Start': '2024-01-01', 'Finish': '2024-01-02'})
+
+    def full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(handler, 'append_journal' if journal else '_write_json', full)
+    with pytest.raises(OSError):
+        handler.add_task(tasks, {'Task': '未保存', 'Start': '2024-01-01', 'Finish': '2024-01-02'})
+    with pytest.raises(OSError):
+        handler.write_batch([('update', 0, {'Notes': '未保存'}, None), ('delete', 0)])
+    with pytest.raises(OSError):
+        handler.update_task(tasks, 0, {'Status': '已完成'})
+    assert handler.disk_view() is None
+    session = SessionTasks(tasks)
+    writer = WriteBehind(handler, session)
+    session.writable(0).notes = '稍後保存'
+    assert writer.flush(force=True) == 0
+    assert writer.error and writer.pending
+    monkeypatch.undo()
+
+    assert [(task.name, task.status, task.notes) for task in handler.current_tasks()] == [('舊任務', '未開始', '')]
+    assert writer.flush(force=True) == 1 and writer.error is None
+    stored = DataHandler(handler.file_path, journal=journal).read_tasks()
+    assert [(task.name, task.notes, task.version) for task in stored] == [('舊任務', '稍後保存', 2)]
@@ -0,0 +1,40 @@
+# tests/test_detail_view.py
+from datetime import date, timedelta
+
+from utils.data_handler import Task
+from utils.detail_view import PREDECESSOR_OPTIONS, predecessor_options
+from utils.task_collection import TaskCollection
+
+BASE = date(2024, 1, 1)
+
+
+def _tasks(count):
+    """每天開始一筆、工期兩天的任務，名稱含「管線」或「配電」"""
+    return TaskCollection(
+        Task(id=i, name=f"{'管線' if i % 2 else '配電'}{i}", start=BASE + timedelta(i), finish=BASE + timedelta(i + 2))
+        for i in range(count)
+    )
+
+
+def test_nearby_tasks_are_limited():
+    """未搜尋時只列出開始日前 30 天內進行中的任務，結束較晚的優先，已選的任務排在最前"""
+    tasks = _tasks(300)
+    start = BASE + timedelta(200)
+    options = predecessor_options(tasks, [5, 5, 999], '', start, exclude=200)
+    assert options[0] == 5
+    assert 200 not in options and 999 not in options
+    nearby = [task.id for task in tasks if task.start <= start and task.finish >= start - timedelta(30)]
+    assert set(options[1:]) <= set(nearby)
+    assert options[1:] == sorted(options[1:], key=lambda task_id: tasks.get(task_id).finish, reverse=True)
+    assert len(predecessor_options(_tasks(300), [], '', BASE + timedelta(299))) <= PREDECESSOR_OPTIONS
+
+
+def test_search_results_are_limited():
+    """有搜尋字串時列出至多 PREDECESSOR_OPTIONS 筆搜尋結果，不重複列出已選的任務"""
+    tasks = _tasks(300)
+    options = predecessor_options(tasks, [1, 2], '管線', BASE)
+    assert options[:2] == [1, 2]
+    assert len(options) == 2 + PREDECESSOR_OPTIONS
+    assert len(set(options)) == len(options)
+    assert all('管線' in tasks.get(task_id).name for task_id in options[2:])
+    assert predecessor_options(tasks, [], '', None) == []
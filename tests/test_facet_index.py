@@ -0,0 +1,76 @@
+# tests/test_facet_index.py
+import random
+from collections import Counter
+
+import pytest
+
+from utils.data_handler import Task
+from utils.facet_index import FACETS, FacetIndex
+
+VALUES = {
+    'status': ['未開始', '進行中', '已完成'],
+    'category': ['土木', '機電', '裝修', ''],
+    'created_by': ['admin', 'viewer', None],
+}
+
+
+def _brute_select(tasks, filters):
+    return [
+        task_id for task_id, task in tasks.items()
+        if all(not values or getattr(task, facet) in values for facet, values in filters.items())
+    ]
+
+
+def _brute_counts(tasks, facet, filters):
+    others = {key: values for key, values in filters.items() if key != facet}
+    return Counter(getattr(tasks[task_id], facet) for task_id in _brute_select(tasks, others))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_brute_force(seed):
+    """隨機增刪與修改（含擴充容量與整理空列）後，篩選與計數和逐筆比對一致，副本互不影響"""
+    rng = random.Random(seed)
+
+    def random_task(task_id):
+        return Task(id=task_id, status=rng.choice(VALUES['status']), category=rng.choice(VALUES['category']),
+                    created_by=rng.choice(VALUES['created_by']))
+
+    def random_filters():
+        return {facet: rng.sample(values, rng.randint(0, 2)) for facet, values in VALUES.items()}
+
+    # 依加入順序保存，更新保留原位置、刪除後重新加入排到最後
+    tasks = {i: random_task(i) for i in range(rng.choice([0, 10, 1500]))}
+    index = FacetIndex(tasks.values())
+    snapshot = None
+    for step in range(3000):
+        roll = rng.random()
+        if roll < 0.45 and tasks:
+            task_id = rng.choice(list(tasks))
+            del tasks[task_id]
+            index.remove(task_id)
+        else:
+            task_id = rng.randint(0, 2500)
+            tasks[task_id] = random_task(task_id)
+            index.add(tasks[task_id])
+        if step == 1500:
+            snapshot, frozen = index.copy(), dict(tasks)
+        if step % 50 == 0:
+            filters = random_filters()
+            assert index.select(filters) == _brute_select(tasks, filters)
+            for facet in FACETS:
+                counts = {value: count for value, count in index.counts(facet, filters).items() if count}
+                assert counts == _brute_counts(tasks, facet, filters)
+            assert len(index) == len(tasks)
+    for _ in range(10):
+        filters = random_filters()
+        assert snapshot.select(filters) == _brute_select(frozen, filters)
+
+
+def test_values_without_tasks_are_dropped():
+    """某個值的最後一個任務被刪除或改值後，不再列在計數中"""
+    index = FacetIndex([Task(id=1, status='未開始'), Task(id=2, status='進行中')])
+    index.add(Task(id=2, status='未開始'))
+    assert index.counts('status') == {'未開始': 2}
+    index.remove(1)
+    index.remove(2)
+    assert index.counts('status') == {} and index.select({}) == []
@@ -0,0 +1,70 @@
+# tests/test_figure_cache.py
+from utils import figure_cache
+from utils.data_handler import DataHandler
+from utils.task_collection import TaskCollection
+
+
+def _handlers(tmp_path):
+    path = str(tmp_path / "data" / "tasks.json")
+    return DataHandler(path, journal=True), DataHandler(path, journal=True)
+
+
+def _task(name):
+    return {'Task': name, 'Start': '2024-01-01', 'Finish': '2024-01-05'}
+
+
+def test_write_through_other_handler_expires_figures(tmp_path):
+    """另一個實例寫入後，舊版本的圖表失效"""
+    first, second = _handlers(tmp_path)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return None
+
+    version = first.change_version
+    figure_cache.get_figure(first, version, 'gantt', (), build)
+    figure_cache.get_figure(second, version, 'gantt', (), build)
+    assert len(builds) == 1
+
+    second.add_task(TaskCollection(), _task('新任務'))
+    assert first.change_version == version + 1
+    # 落後的版本只建立不快取
+    figure_cache.get_figure(first, version, 'gantt', (), build)
+    figure_cache.get_figure(first, version, 'gantt', (), build)
+    assert len(builds) == 3
+    # 新版本只建立一次，兩個實例共用
+    figure_cache.get_figure(first, version + 1, 'gantt', (), build)
+    figure_cache.get_figure(second, version + 1, 'gantt', (), build)
+    assert len(builds) == 4
+
+
+def test_versions_are_not_reused_across_handlers(tmp_path):
+    """兩個實例各自寫入，版本持續遞增且不重複"""
+    first, second = _handlers(tmp_path)
+    tasks = TaskCollection()
+    first.add_task(tasks, _task('甲'))
+    second.add_task(tasks, _task('乙'))
+    assert first.change_version == second.change_version == 2
+    assert first.changes_since(1) is not None and len(first.changes_since(1)) == 1
+    assert first.changes_since(3) is None
+
+
+def test_full_replace_refreshes_shared_caches(tmp_path):
+    """整份覆蓋（如取代匯入）遞增版本，任務與圖表快取不需另外清除"""
+    from utils import task_cache
+
+    first, second = _handlers(tmp_path)
+    first.add_task(TaskCollection(), _task('舊任務'))
+    tasks, version = task_cache.get_tasks(first)
+    figure_cache.get_figure(first, version, 'gantt', (), lambda: None)
+
+    replacement = TaskCollection()
+    second.add_task(replacement, _task('新任務'))
+    second.save_tasks(replacement)
+    tasks, new_version = task_cache.get_tasks(first)
+    assert new_version > version
+    assert [task.name for task in tasks] == ['新任務']
+    builds = []
+    figure_cache.get_figure(first, new_version, 'gantt', (), lambda: builds.append(1))
+    assert builds == [1]
@@ -0,0 +1,69 @@
+# tests/test_importer.py
+import pandas as pd
+
+from utils.data_handler import Task
+from utils.importer import merge_chunks
+from utils.task_collection import TaskCollection
+
+
+def _tasks(*names):
+    return TaskCollection(
+        Task(id=i, name=name, start='2024-01-01', finish='2024-01-02', category='甲', status='未開始')
+        for i, name in enumerate(names)
+    )
+
+
+def _frame(*rows):
+    return pd.DataFrame(
+        [(name, '2024-01-01', '2024-01-02', '甲', status) for name, status in rows],
+        columns=['Task', 'Start', 'Finish', 'Category', 'Status'],
+    )
+
+
+def test_duplicate_keys_in_file_are_reported():
+    """匯入檔中重複的比對鍵只採用第一列，其餘列為錯誤"""
+    tasks = _tasks('設計')
+    counts, errors = merge_chunks([_frame(('設計', '進行中'), ('施工', '未開始'), ('設計', '已完成'))], tasks, 'admin')
+    assert errors == [(4, '比對鍵與第 2 列重複')]
+    assert tasks.get(0).status == '進行中'
+    assert counts == {'inserted': 1, 'updated': 1, 'deleted': 0, 'unchanged': 0}
+
+
+def test_duplicate_keys_in_existing_tasks_are_reported():
+    """對應到多個現有任務的比對鍵不套用，也不刪除這些任務"""
+    tasks = _tasks('設計', '設計', '驗收')
+    counts, errors = merge_chunks([_frame(('設計', '已完成'))], tasks, 'admin')
+    assert errors == [(2, '比對鍵對應到多個現有任務（id 0、1）')]
+    assert [task.status for task in tasks] == ['未開始', '未開始']
+    assert counts['deleted'] == 1 and tasks.get(2) is None
+
+
+def test_missing_duplicate_existing_tasks_are_all_deleted():
+    """匯入檔中沒有的重複任務全部刪除"""
+    tasks = _tasks('設計', '設計', '驗收')
+    counts, errors = merge_chunks([_frame(('驗收', '未開始'))], tasks, 'admin')
+    assert not errors
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 1}
+    assert [task.name for task in tasks] == ['驗收']
+
+
+def test_invalid_rows_do_not_delete_matching_tasks():
+    """驗證失敗的列不套用，但對應的現有任務不會被當成缺少而刪除"""
+    tasks = _tasks('設計', '施工', '驗收')
+    frame = _frame(('設計', '進行中'), ('施工', '已完成'))
+    frame.loc[1, 'Finish'] = '2023-12-01'
+    counts, errors = merge_chunks([frame], tasks, 'admin')
+    assert errors == [(3, '結束日期早於開始日期')]
+    assert counts == {'inserted': 0, 'updated': 1, 'deleted': 1, 'unchanged': 0}
+    assert [(task.name, task.status) for task in tasks] == [('設計', '進行中'), ('施工', '未開始')]
+
+
+def test_rows_with_unreadable_keys_skip_deletion():
+    """比對鍵欄位本身無效時無法判斷對應的任務，整批不刪除"""
+    tasks = _tasks('設計', '施工')
+    frame = _frame(('設計', '進行中'), ('施工', '已完成'))
+    frame.loc[1, 'Start'] = '2024-13-45'
+    counts, errors = merge_chunks([frame], tasks, 'admin', key=('Task', 'Start'))
+    assert errors == [(3, '開始日期無效'), (3, '無法判斷此列的比對鍵，未刪除匯入檔中不存在的任務')]
+    assert counts == {'inserted': 0, 'updated': 1, 'deleted': 0, 'unchanged': 0}
+    assert [task.name for task in tasks] == ['設計', '施工']
@@ -0,0 +1,53 @@
+# tests/test_interval_index.py
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.interval_index import IntervalIndex
+
+BASE = date(2024, 1, 1)
+
+
+def _brute(spans, lo, hi):
+    return sorted((start, task_id) for task_id, (start, finish) in spans.items() if start <= hi and finish >= lo)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_brute_force(seed):
+    """隨機增刪（含極長工期的任務）後，查詢結果與逐筆比對一致，副本互不影響"""
+    rng = random.Random(seed)
+
+    def span():
+        start = BASE + timedelta(rng.randint(0, 400))
+        return start, start + timedelta(rng.choice([0, 1, 5, 30, 1000]))
+
+    spans = {task_id: span() for task_id in range(200)}
+    index = IntervalIndex((task_id, start, finish) for task_id, (start, finish) in spans.items())
+    for step in range(300):
+        task_id = rng.randint(0, 260)
+        if rng.random() < 0.3:
+            spans.pop(task_id, None)
+            index.remove(task_id)
+        else:
+            spans[task_id] = span()
+            index.add(task_id, *spans[task_id])
+        if step % 50 == 0:
+            snapshot, frozen = index.copy(), dict(spans)
+            index.add(999, BASE, BASE)
+            index.remove(999)
+        lo = BASE + timedelta(rng.randint(-20, 420))
+        hi = lo + timedelta(rng.randint(0, 40))
+        expected = _brute(spans, lo, hi)
+        assert index.overlapping(lo, hi) == [task_id for _, task_id in expected]
+        assert index.count_overlapping(lo, hi) == len(expected)
+        assert len(index) == len(spans)
+    assert snapshot.overlapping(BASE, BASE + timedelta(2000)) == [
+        task_id for _, task_id in _brute(frozen, BASE, BASE + timedelta(2000))]
+
+
+def test_missing_dates_are_not_indexed():
+    index = IntervalIndex([(1, BASE, None), (2, BASE, BASE)])
+    index.add(3, None, BASE)
+    assert index.overlapping(BASE, BASE) == [2]
+    assert index.overlapping(BASE + timedelta(1), BASE) == []
@@ -0,0 +1,82 @@
+# tests/test_main_view.py
+import json
+import os
+from datetime import date
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MONTHS = {1: '一月', 2: '二月', 3: '三月'}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """以檢視者登入，數據為每月各兩筆任務（名稱含「管線」），每月一筆已完成"""
+    records = []
+    for month, label in MONTHS.items():
+        for day, status in ((3, '未開始'), (10, '已完成')):
+            records.append({
+                'id': len(records), 'Task': f'{label}{day}日 管線', 'Start': f'2024-{month:02d}-{day:02d}',
+                'Finish': f'2024-{month:02d}-{day + 2:02d}', 'Category': '施工', 'Status': status, 'version': 1,
+            })
+    os.makedirs(tmp_path / "data")
+    with open(tmp_path / "data" / "tasks.json", 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=60).run()
+    at.text_input[0].input("viewer")
+    at.text_input[1].input("viewer123")
+    at.button[0].click().run()
+    at.selectbox(key="date_window").select("自訂區間").run()
+    return at
+
+
+def _shown(at):
+    """任務列表中顯示的任務名稱"""
+    assert not at.exception
+    return sorted(
+        name for element in at.markdown
+        for name in [f'{label}{day}日 管線' for label in MONTHS.values() for day in (3, 10)]
+        if name in element.value
+    )
+
+
+def _month(month):
+    return date(2024, month, 1), date(2024, month, 28)
+
+
+def test_switching_window_and_query_shows_current_rows(app):
+    """切換日期區間、搜尋與篩選後，列表只顯示目前條件下的任務"""
+    app.date_input(key="date_range").set_value(_month(1))
+    app.text_input(key="task_search").input("管線").run()
+    assert _shown(app) == ['一月10日 管線', '一月3日 管線']
+
+    app.text_input(key="task_search").input("")
+    app.date_input(key="date_range").set_value(_month(2)).run()
+    assert _shown(app) == ['二月10日 管線', '二月3日 管線']
+
+    app.text_input(key="task_search").input("管線")
+    app.date_input(key="date_range").set_value(_month(3)).run()
+    assert _shown(app) == ['三月10日 管線', '三月3日 管線']
+
+    app.multiselect(key="facet_status").select('已完成').run()
+    assert _shown(app) == ['三月10日 管線']
+    app.date_input(key="date_range").set_value(_month(1)).run()
+    assert _shown(app) == ['一月10日 管線']
+    app.text_input(key="task_search").input("").run()
+    app.date_input(key="date_range").set_value(_month(2)).run()
+    assert _shown(app) == ['二月10日 管線']
+
+
+def test_repeated_switches_never_show_stale_rows(app):
+    """反覆切換時衍生集合會被回收重建，不能沿用其他條件的快取結果"""
+    expected = {1: ['一月10日 管線', '一月3日 管線'], 2: ['二月10日 管線', '二月3日 管線'], 3: ['三月10日 管線', '三月3日 管線']}
+    for step in range(12):
+        month = step % 3 + 1
+        app.text_input(key="task_search").input("管線" if step % 2 else "")
+        app.multiselect(key="facet_status").set_value(['已完成'] if step % 4 >= 2 else [])
+        app.date_input(key="date_range").set_value(_month(month)).run()
+        rows = expected[month] if step % 4 < 2 else expected[month][:1]
+        assert _shown(app) == rows, step
@@ -0,0 +1,95 @@
+# tests/test_schedule.py
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.data_handler import Task
+from utils.schedule import Schedule
+
+BASE = date(2024, 1, 1)
+
+
+def _task(task_id, offset=0, days=2, predecessors=()):
+    start = BASE + timedelta(offset)
+    return Task(id=task_id, name=str(task_id), start=start, finish=start + timedelta(days), predecessors=predecessors)
+
+
+def _state(schedule):
+    ids = sorted(schedule._start)
+    return {i: schedule.timing(i) for i in ids}, schedule.critical(), schedule.finish
+
+
+def _check(schedule):
+    """連結依拓撲順序排列，且只略過確實會形成循環的連結"""
+    rank, succ = schedule._rank, schedule._succ
+    dropped = set()
+    for task_id, preds in schedule._preds.items():
+        for pred in preds:
+            assert rank[pred] < rank[task_id]
+        for pred in schedule._declared[task_id]:
+            if pred == task_id:
+                dropped.add(task_id)
+            elif pred in schedule and pred not in preds:
+                # 被略過的連結：pred 必須已是此任務的後續任務
+                seen, stack = {task_id}, [task_id]
+                while stack:
+                    for node in succ[stack.pop()]:
+                        if node not in seen:
+                            seen.add(node)
+                            stack.append(node)
+                assert pred in seen, (pred, task_id)
+                dropped.add(task_id)
+    assert schedule.cyclic == dropped
+
+
+def test_removing_task_restores_links_dropped_for_cycle():
+    """循環中的任務被移除後，原本被略過的連結恢復計算"""
+    schedule = Schedule([_task(11, predecessors=(12,)), _task(23, predecessors=(11,)),
+                         _task(7, predecessors=(23,)), _task(12, predecessors=(7,))])
+    assert schedule.cyclic
+    schedule.remove(12)
+    assert not schedule.cyclic
+    assert _state(schedule) == _state(Schedule([_task(11, predecessors=(12,)), _task(23, predecessors=(11,)),
+                                                _task(7, predecessors=(23,))]))
+
+
+def test_relinking_restores_links_dropped_for_cycle():
+    """修改前置任務解開循環後，其他任務被略過的連結恢復計算"""
+    schedule = Schedule([_task(1), _task(2, predecessors=(1,)), _task(3, predecessors=(2,))])
+    schedule.add(_task(1, predecessors=(3,)))
+    assert schedule.cyclic
+    schedule.add(_task(2))
+    assert not schedule.cyclic
+    _check(schedule)
+    assert schedule.timing(1).early_start == schedule.timing(3).early_finish + timedelta(1)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_incremental_updates_match_full_rebuild(seed):
+    """隨機新增、修改、刪除（含形成與解開循環）後，與整份重建的結果一致"""
+    rng = random.Random(seed)
+
+    def random_task(task_id, count):
+        preds = rng.sample(range(count + 5), rng.randint(0, 3))
+        return _task(task_id, rng.randint(0, 60), rng.randint(0, 10), preds)
+
+    for _ in range(40):
+        count = rng.randint(1, 30)
+        tasks = {i: random_task(i, count) for i in range(count)}
+        schedule = Schedule(tasks.values())
+        for _ in range(30):
+            if rng.random() < 0.25 and tasks:
+                task_id = rng.choice(list(tasks))
+                del tasks[task_id]
+                schedule.remove(task_id)
+            else:
+                task_id = rng.randint(0, count + 5)
+                tasks[task_id] = random_task(task_id, count)
+                schedule.add(tasks[task_id])
+            _check(schedule)
+            full = Schedule(tasks.values())
+            assert bool(schedule.cyclic) == bool(full.cyclic)
+            if not full.cyclic:
+                assert _state(schedule) == _state(full)
+            assert _state(schedule.copy()) == _state(schedule)
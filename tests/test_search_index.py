@@ -0,0 +1,113 @@
+# tests/test_search_index.py
+import random
+
+import pytest
+
+from utils.data_handler import ChecklistItem, Task
+from utils.search_index import SearchIndex, document, query_tokens
+
+WORDS = ['管線', '配電', '基礎', '鋼筋', '模板', '驗收', 'A棟', 'B2棟', 'Pump', 'pipe', 'RC', '3F']
+
+
+def _task(task_id, name, notes='', items=()):
+    return Task(id=task_id, name=name, notes=notes, checklist=[ChecklistItem(item) for item in items])
+
+
+def _brute(tasks, query):
+    """逐筆比對：查詢的每個詞元都出現在任務的詞元中"""
+    tokens = set(query_tokens(query))
+    if not tokens:
+        return set()
+    return {task.id for task in tasks.values() if tokens <= set(document(task))}
+
+
+def _postings_of(index, task_id):
+    return {token for token, posting in index._postings.items() if task_id in posting}
+
+
+def test_single_character_query():
+    """單一中文字以單字詞元比對"""
+    index = SearchIndex([_task(1, '管線配置'), _task(2, '配電'), _task(3, '基礎')])
+    assert sorted(index.search('配')) == [1, 2]
+    assert index.search('礎') == [3]
+    assert index.search('驗') == []
+
+
+def test_mixed_latin_and_cjk():
+    """中英混合文字分開切詞，英數不分大小寫並可用前綴比對"""
+    index = SearchIndex([_task(1, 'B2棟 Pump 更換'), _task(2, 'B棟管線', notes='pump 保養'), _task(3, 'A棟')])
+    assert index.search('b2') == [1]
+    assert sorted(index.search('PUM')) == [1, 2]
+    assert index.search('B2棟') == [1]
+    assert index.search('棟管') == [2]
+    assert sorted(index.search('棟')) == [1, 2, 3]
+
+
+def test_rename_removes_old_postings():
+    """改名後舊名稱查不到，posting 中也不留舊詞元"""
+    index = SearchIndex([_task(1, '管線配置'), _task(2, '管線')])
+    index.add(_task(1, '鋼筋綁紮'))
+    assert index.search('配置') == []
+    assert index.search('管線') == [2]
+    assert index.search('鋼筋') == [1]
+    assert _postings_of(index, 1) == set(document(_task(1, '鋼筋綁紮')))
+    index.remove(2)
+    assert index.search('管線') == []
+    assert not any(token in index._postings for token in ('管線', '管', '線'))
+
+
+def test_latin_matches_word_prefixes_only():
+    """英數以單字前綴比對，不比對單字中間的字串"""
+    index = SearchIndex([_task(1, 'Pump 更換'), _task(2, 'RC牆')])
+    assert index.search('pu') == [1]
+    assert index.search('ump') == []
+    assert index.search('rc') == [2]
+
+
+def test_name_ranks_above_notes():
+    index = SearchIndex([_task(1, '模板', notes='管線'), _task(2, '管線')])
+    assert index.search('管線') == [2, 1]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_brute_force(seed):
+    """隨機新增、改名、刪除後，查詢結果與逐筆比對一致，且包含所有含有查詢字串的任務"""
+    rng = random.Random(seed)
+
+    def text():
+        # 中文詞直接相連（可跨詞組成二字詞元），英數詞以空白分隔（英數以單字前綴比對）
+        result = ''
+        for word in rng.sample(WORDS, rng.randint(0, 3)):
+            if result and (result[-1].isascii() or word[0].isascii()):
+                result += ' '
+            result += word
+        return result
+
+    def random_task(task_id):
+        return _task(task_id, text(), text(), [text() for _ in range(rng.randint(0, 2))])
+
+    tasks = {i: random_task(i) for i in range(40)}
+    index = SearchIndex(tasks.values())
+    snapshot = None
+    for step in range(200):
+        task_id = rng.randint(0, 60)
+        if rng.random() < 0.3:
+            tasks.pop(task_id, None)
+            index.remove(task_id)
+        else:
+            tasks[task_id] = random_task(task_id)
+            index.add(tasks[task_id])
+        if step == 100:
+            snapshot, frozen = index.copy(), dict(tasks)
+        word = rng.choice(WORDS)
+        # 查詢從單字開頭起算；中文的最後一字也可單獨查詢
+        query = rng.choice([word, word[:1], word + rng.choice(WORDS)] + ([word[-1:]] if not word[-1].isascii() else []))
+        found = set(index.search(query))
+        assert found == _brute(tasks, query), query
+        # 含有查詢字串的任務一定找得到（英數不分大小寫）
+        for task in tasks.values():
+            texts = [task.name, task.notes] + [item.item for item in task.checklist]
+            if any(query.lower() in value.lower() for value in texts):
+                assert task.id in found, (query, task.id)
+    for word in WORDS:
+        assert set(snapshot.search(word)) == _brute(frozen, word)
@@ -0,0 +1,41 @@
+# tests/test_snapshot.py
+from utils.data_handler import ChecklistItem, DataHandler, Task
+from utils.snapshot import read_snapshot
+from utils.task_collection import TaskCollection
+
+
+def _tasks():
+    return TaskCollection([
+        Task(id=0, name='基礎工程', start='2024-01-01', finish='2024-01-31', category='土木', status='進行中',
+             notes='第一行\n第二行', checklist=[ChecklistItem('放樣', True), ChecklistItem('開挖')],
+             progress=12.5, created_by='admin', created_at='2024-01-01 08:00:00', version=3,
+             predecessors=[2], next_item_id=7, extra={'history': [{'time': '2024-01-02', 'action': '修改'}]}),
+        Task(id=2, name='', start=None, finish=None, category='', status='未開始', notes='',
+             created_by=None, version=None),
+        Task(id=5, name='機電 😀', start='2023-12-31', finish='2024-03-01', category='土木', status='已完成',
+             progress=100, created_by='viewer', last_modified='2024-02-01T10:00:00', version=1),
+    ])
+
+
+def test_snapshot_round_trip_matches_json(tmp_path):
+    """寫入二進位快照後讀回的任務與由 JSON 讀取的完全相同"""
+    path = str(tmp_path / "data" / "tasks.json")
+    DataHandler(path, snapshot=True).save_tasks(_tasks())
+    from_json = DataHandler(path).read_tasks()
+
+    handler = DataHandler(path, snapshot=True)
+    assert read_snapshot(handler.snapshot_path, handler._json_stamp()) is not None
+    from_snapshot = handler.read_tasks()
+    assert [task.to_dict() for task in from_snapshot] == [task.to_dict() for task in from_json]
+    assert [task.to_dict() for task in from_json] == [task.to_dict() for task in _tasks()]
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    """JSON 在快照之後被改動時不使用快照"""
+    path = str(tmp_path / "data" / "tasks.json")
+    handler = DataHandler(path, snapshot=True)
+    handler.save_tasks(_tasks())
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[{"id": 9, "Task": "外部修改", "Start": "2024-01-01", "Finish": "2024-01-02"}]')
+    assert read_snapshot(handler.snapshot_path, handler._json_stamp()) is None
+    assert [task.name for task in DataHandler(path, snapshot=True).read_tasks()] == ['外部修改']
@@ -0,0 +1,45 @@
+# tests/test_sqlite_handler.py
+import pytest
+
+from utils.data_handler import Task, VersionConflict
+from utils.sqlite_handler import SQLiteDataHandler
+from utils.task_cache import SessionTasks
+from utils.task_collection import TaskCollection
+from utils.write_behind import WriteBehind
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = SQLiteDataHandler(str(tmp_path / "data" / "tasks.db"))
+    tasks = TaskCollection()
+    for i in range(3):
+        tasks.add(Task.from_dict({'id': i, 'Task': f'任務{i}', 'Start': '2024-01-01', 'Finish': '2024-01-05'}))
+    handler.save_tasks(tasks)
+    return handler
+
+
+def test_write_behind_saves_through_sqlite(handler):
+    """寫入延遲層可直接使用 SQLite 數據處理器"""
+    tasks = SessionTasks(handler.load_tasks())
+    writer = WriteBehind(handler, tasks)
+    tasks.writable(1).notes = '已確認'
+    tasks.remove(2)
+    tasks.add(Task.from_dict({'Task': '新任務', 'Start': '2024-02-01', 'Finish': '2024-02-02'}))
+    writer.flush(force=True)
+    assert not writer.pending and not writer.pop_conflicts()
+    stored = handler.load_tasks()
+    assert stored.get(1).notes == '已確認' and stored.get(1).version == 2
+    assert stored.get(2) is None and stored.get(3).name == '新任務'
+    assert tasks.get(1).version == 2
+
+
+def test_update_checks_version(handler):
+    """與 DataHandler 相同：對方改到相同欄位時衝突，否則合併"""
+    first, second = handler.load_tasks(), handler.load_tasks()
+    base = second.get(0)
+    handler.update_task(first, 0, {'Notes': '甲'})
+    handler.update_task(second, 0, {'Status': '進行中'}, base=base)
+    stored = handler.get_task(0)
+    assert (stored.notes, stored.status, stored.version) == ('甲', '進行中', 3)
+    with pytest.raises(VersionConflict):
+        handler.update_task(TaskCollection(), 0, {'Notes': '乙'}, base=base)
@@ -0,0 +1,103 @@
+# tests/test_write_behind.py
+import random
+import threading
+
+from utils.data_handler import DataHandler, Task
+from utils.task_cache import SessionTasks
+from utils.task_collection import TaskCollection
+from utils.write_behind import WriteBehind
+
+
+def _handler(tmp_path, count):
+    handler = DataHandler(str(tmp_path / "data" / "tasks.json"), journal=True)
+    tasks = TaskCollection()
+    for i in range(count):
+        tasks.add(Task.from_dict({'id': i, 'Task': f'任務{i}', 'Start': '2024-01-01', 'Finish': '2024-01-05', 'version': 1}))
+    handler.save_tasks(tasks)
+    return handler
+
+
+def test_edit_during_background_save_is_kept(tmp_path):
+    """背景保存進行中修改的任務仍列為待保存"""
+    handler = _handler(tmp_path, 3)
+    tasks = SessionTasks(handler.read_tasks())
+    writer = WriteBehind(handler, tasks, interval=60)
+    tasks.writable(1).notes = '甲'
+    writer.flush()
+    writer._timer.cancel()
+
+    started, release = threading.Event(), threading.Event()
+    original = handler.write_batch
+
+    def slow_write(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return original(*args, **kwargs)
+
+    handler.write_batch = slow_write
+    background = threading.Thread(target=writer._drain)
+    background.start()
+    started.wait(5)
+    tasks.writable(2).notes = '乙'
+    release.set()
+    background.join()
+
+    assert tasks.has_changes
+    writer.flush(force=True)
+    disk = handler.read_tasks()
+    assert disk.get(1).notes == '甲' and disk.get(2).notes == '乙'
+    assert not writer.pending
+
+
+def test_concurrent_timer_saves_match_session(tmp_path):
+    """計時器頻繁在背景保存時，最後檔案內容與 session 一致"""
+    handler = _handler(tmp_path, 20)
+    tasks = SessionTasks(handler.read_tasks())
+    writer = WriteBehind(handler, tasks, interval=0.001)
+    rng = random.Random(0)
+    for step in range(300):
+        task_id = rng.randrange(20)
+        tasks.writable(task_id).notes = f'備註{step}'
+        writer.flush()
+    writer.flush(force=True)
+    assert not writer.pending and not writer.pop_conflicts()
+    disk = handler.read_tasks()
+    assert {task.id: task.notes for task in disk} == {task.id: task.notes for task in tasks}
+
+
+def test_added_task_gets_id_reassigned_on_collision(tmp_path):
+    """新任務的 id 已被其他行程占用時，session 中的任務改用新分配的 id"""
+    handler = _handler(tmp_path, 2)
+    tasks = SessionTasks(handler.read_tasks())
+    writer = WriteBehind(handler, tasks, interval=60)
+    other = DataHandler(handler.file_path, journal=True)
+    other.add_task(TaskCollection(), {'id': 2, 'Task': '其他行程', 'Start': '2024-01-01', 'Finish': '2024-01-02'})
+
+    local = tasks.add(Task.from_dict({'Task': '本地', 'Start': '2024-01-01', 'Finish': '2024-01-02'}))
+    assert local.id == 2
+    writer.flush(force=True)
+    assert tasks.get(2) is None
+    assert tasks.get(3).name == '本地' and tasks.get(3).version == 1
+    assert sorted(task.name for task in handler.read_tasks()) == ['任務0', '任務1', '其他行程', '本地']
+
+
+def test_bulk_changes_are_saved_in_one_write(tmp_path):
+    """大量修改整批保存：只追加一次日誌，且與逐筆保存的結果相同"""
+    handler = _handler(tmp_path, 50)
+    tasks = SessionTasks(handler.read_tasks())
+    writer = WriteBehind(handler, tasks)
+    for task_id in range(0, 50, 2):
+        tasks.update(task_id, {'Notes': '批次'})
+    for task_id in range(1, 10, 2):
+        tasks.remove(task_id)
+    for i in range(100):
+        tasks.add(Task.from_dict({'Task': f'新任務{i}', 'Start': '2024-03-01', 'Finish': '2024-03-02'}))
+
+    appended = []
+    original = handler.append_journal
+    handler.append_journal = lambda ops, disk: appended.append(len(ops)) or original(ops, disk)
+    writer.flush(force=True)
+    assert appended == [25 + 5 + 100]
+    disk = handler.read_tasks()
+    assert {task.id: (task.name, task.notes) for task in disk} == {task.id: (task.name, task.notes) for task in tasks}
+    assert all(task.version == 2 for task in disk if task.notes == '批次')
@@ -0,0 +1,62 @@
+# utils/aggregates.py
+from collections import Counter
+
+# 任務狀態（依顯示順序）
+STATUSES = ['未開始', '進行中', '已完成']
+
+
+class TaskAggregates:
+    """增量維護的專案統計：各狀態/類別任務數與檢查項目完成數"""
+
+    def __init__(self):
+        self.total = 0
+        self.status_counts = Counter()
+        self.category_counts = Counter()
+        self.checklist_total = 0
+        self.checklist_done = 0
+
+    def copy(self):
+        """複製統計"""
+        clone = TaskAggregates()
+        clone.total = self.total
+        clone.status_counts = self.status_counts.copy()
+        clone.category_counts = self.category_counts.copy()
+        clone.checklist_total = self.checklist_total
+        clone.checklist_done = self.checklist_done
+        return clone
+
+    @staticmethod
+    def contribution(task):
+        """單一任務對統計的貢獻"""
+        checklist = task.checklist
+        done = sum(1 for item in checklist if item.completed)
+        return task.status, task.category, len(checklist), done
+
+    def add(self, contribution, sign=1):
+        """加入（sign=-1 時扣除）一筆任務貢獻"""
+        status, category, total, done = contribution
+        self.total += sign
+        self.status_counts[status] += sign
+        self.category_counts[category] += sign
+        self.checklist_total += sign * total
+        self.checklist_done += sign * done
+        if self.status_counts[status] <= 0:
+            del self.status_counts[status]
+        if self.category_counts[category] <= 0:
+            del self.category_counts[category]
+
+    def remove(self, contribution):
+        """扣除一筆任務貢獻"""
+        self.add(contribution, sign=-1)
+
+    def count(self, status):
+        """指定狀態的任務數"""
+        return self.status_counts.get(status, 0)
+
+    def completion_rate(self):
+        """已完成任務比例（百分比）"""
+        return (self.count('已完成') / self.total * 100) if self.total else 0
+
+    def checklist_rate(self):
+        """整體檢查項目完成比例（百分比）"""
+        return (self.checklist_done / self.checklist_total * 100) if self.checklist_total else 0
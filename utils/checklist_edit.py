@@ -0,0 +1,75 @@
+# utils/checklist_edit.py
+from utils.data_handler import ChecklistItem, item_counter
+
+
+class ChecklistChanges:
+    """一次套用的檢查項目變更：勾選、改名、新增、刪除與排序
+
+    變更以項目 id 記錄，可以套用到其他 session 已修改過的檢查項目上；
+    已不存在的項目會被略過，對方新增的項目保留在原排序之後。
+    """
+
+    def __init__(self, completed=None, texts=None, added=None, deleted=None, order=None):
+        # id -> 勾選狀態、id -> 新內容
+        self.completed = dict(completed or {})
+        self.texts = dict(texts or {})
+        # 新增項目 [(內容, 勾選狀態)]、刪除的 id、新的 id 順序
+        self.added = list(added or [])
+        self.deleted = set(deleted or ())
+        self.order = list(order) if order is not None else None
+
+    def __bool__(self):
+        return bool(self.completed or self.texts or self.added or self.deleted or self.order is not None)
+
+    @classmethod
+    def diff(cls, checklist, rows):
+        """比對編輯前的項目與編輯後的列 [(id 或 None, 內容, 勾選狀態)]（依新順序）"""
+        original = {item.id: item for item in checklist}
+        changes = cls()
+        kept = []
+        for item_id, text, completed in rows:
+            item = original.get(item_id)
+            if item is None:
+                if text:
+                    changes.added.append((text, completed))
+                continue
+            kept.append(item_id)
+            if completed != item.completed:
+                changes.completed[item_id] = completed
+            if text and text != item.item:
+                changes.texts[item_id] = text
+        changes.deleted = set(original) - set(kept)
+        remaining = [item.id for item in checklist if item.id not in changes.deleted]
+        if kept != remaining:
+            changes.order = kept
+        return changes
+
+    def apply(self, checklist, next_id=None):
+        """套用到檢查項目列表，回傳新的列表（不修改原本的項目）
+
+        新項目的 id 從 next_id（任務的項目 id 計數）起依序分配。
+        """
+        items = {item.id: item for item in checklist}
+        order = self.order if self.order is not None else [item.id for item in checklist]
+        ordered = set(order)
+        order = order + [item.id for item in checklist if item.id not in ordered]
+        result = []
+        for item_id in order:
+            item = items.get(item_id)
+            if item is None or item_id in self.deleted:
+                continue
+            result.append(ChecklistItem(
+                self.texts.get(item_id, item.item),
+                self.completed.get(item_id, item.completed),
+                item_id,
+            ))
+        next_id = item_counter(checklist, next_id)
+        for text, completed in self.added:
+            result.append(ChecklistItem(text, completed, next_id))
+            next_id += 1
+        return result
+
+    def updates(self, task):
+        """套用到任務，回傳要寫入的欄位（檢查項目與遞增後的項目 id 計數）"""
+        next_id = item_counter(task.checklist, task.next_item_id)
+        return {'Checklist': self.apply(task.checklist, next_id), 'Next_item_id': next_id + len(self.added)}
@@ -1,62 +1,869 @@
 # utils/data_handler.py
+import copy
 import json
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, date
+from functools import lru_cache
 import os
+import sys
+import tempfile
+import threading
+from utils.task_collection import TaskCollection
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class VersionConflict(Exception):
+    """任務已被其他 session 修改，且修改到相同欄位"""
+
+    def __init__(self, task_id, current=None):
+        super().__init__(f"任務 {task_id} 已被其他使用者修改")
+        self.task_id = task_id
+        self.current = current
+
+
+class DataLoadError(Exception):
+    """數據檔無法解析；為避免以不完整的內容覆蓋原有數據，寫入一律中止"""
+
+
+def check_version(task_id, current, updates, base=None, expected=0):
+    """樂觀並行控制：檔案上的版本與預期不同，且對方改到相同欄位時拋出 VersionConflict
+
+    提供修改前的 base 時，對方沒有改到 updates 中的欄位就允許合併。
+    """
+    if current.get('version', 0) == expected:
+        return
+    if base is None or any(
+        current.get(key) != base.get(key) and current.get(key) != value
+        for key, value in updates.items()
+    ):
+        raise VersionConflict(task_id, copy.deepcopy(current))
+
+
+# 任務的 JSON 欄位 -> Task 屬性
+TASK_FIELDS = {
+    'id': 'id',
+    'Task': 'name',
+    'Start': 'start',
+    'Finish': 'finish',
+    'Category': 'category',
+    'Status': 'status',
+    'Notes': 'notes',
+    'Checklist': 'checklist',
+    'Next_item_id': 'next_item_id',
+    'Predecessors': 'predecessors',
+    'Progress': 'progress',
+    'Created_by': 'created_by',
+    'Created_at': 'created_at',
+    'last_modified': 'last_modified',
+    'version': 'version',
+}
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    """解析 ISO 日期字串（相同日期共用同一個 date 物件）"""
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    return datetime.fromisoformat(value).date()
+
+
+def to_date(value):
+    """把字串或 datetime 轉成 date"""
+    if isinstance(value, str):
+        return parse_date(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _intern(value):
+    """狀態、類別等重複出現的字串只保留一份"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class ChecklistItem:
+    """檢查項目；id 在所屬任務內唯一且不會改變，編輯時以 id 而非位置辨識"""
+
+    __slots__ = ('item', 'completed', 'id')
+
+    def __init__(self, item, completed=False, id=None):
+        self.item = item
+        self.completed = completed
+        self.id = id
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 JSON 記錄建立檢查項目"""
+        if isinstance(data, cls):
+            return data
+        return cls(data['item'], bool(data.get('completed', False)), data.get('id'))
+
+    def to_dict(self):
+        """轉回 JSON 記錄"""
+        return {'id': self.id, 'item': self.item, 'completed': self.completed}
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __eq__(self, other):
+        if isinstance(other, ChecklistItem):
+            return self.id == other.id and self.item == other.item and self.completed == other.completed
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        return ChecklistItem(self.item, self.completed, self.id)
+
+    def __repr__(self):
+        return f"ChecklistItem({self.item!r}, {self.completed!r}, id={self.id!r})"
+
+
+def make_checklist(items, next_id=None):
+    """建立檢查項目列表，沒有 id 的項目（舊資料、新增項目）從任務的 id 計數起依序補上"""
+    checklist = [ChecklistItem.from_dict(item) for item in items or ()]
+    if any(item.id is None for item in checklist):
+        next_id = item_counter(checklist, next_id)
+        for item in checklist:
+            if item.id is None:
+                item.id = next_id
+                next_id += 1
+    return checklist
+
+
+def item_counter(checklist, stored=None):
+    """任務的檢查項目 id 計數：只增不減，刪除項目的 id 不會再分配給新項目"""
+    return max(stored or 1, max((item.id for item in checklist if item.id is not None), default=0) + 1)
+
+
+def make_predecessors(values):
+    """前置任務 id 轉成不重複的 tuple（保留順序）"""
+    return tuple(dict.fromkeys(int(value) for value in values)) if values else ()
+
+
+class Task:
+    """任務：固定欄位以 __slots__ 保存，其他欄位（如 history）放在 extra
+
+    也可以用 JSON 欄位名稱存取（task['Status']、task.get('Checklist')），
+    供保存、匯入與統計等依欄位名稱處理任務的程式使用；值為 None 的
+    欄位視為不存在。
+    """
+
+    __slots__ = tuple(TASK_FIELDS.values()) + ('extra',)
+
+    def __init__(self, id=None, name='', start=None, finish=None, category='', status='未開始',
+                 notes='', checklist=None, progress=0, created_by=None, created_at=None,
+                 last_modified=None, version=None, predecessors=None, next_item_id=None, extra=None):
+        self.id = id
+        self.name = name
+        self.start = to_date(start)
+        self.finish = to_date(finish)
+        self.category = _intern(category)
+        self.status = _intern(status)
+        self.notes = notes
+        self.checklist = make_checklist(checklist, next_item_id)
+        self.next_item_id = item_counter(self.checklist, next_item_id)
+        self.predecessors = make_predecessors(predecessors)
+        self.progress = progress
+        self.created_by = _intern(created_by)
+        self.created_at = created_at
+        self.last_modified = last_modified
+        self.version = version
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 JSON 記錄建立任務（日期解析有快取，未知欄位保留在 extra）"""
+        if isinstance(data, cls):
+            return data
+        task = cls.__new__(cls)
+        get = data.get
+        task.id = get('id')
+        task.name = get('Task', '')
+        task.start = to_date(get('Start'))
+        task.finish = to_date(get('Finish'))
+        task.category = _intern(get('Category', ''))
+        task.status = _intern(get('Status', '未開始'))
+        task.notes = get('Notes', '')
+        task.checklist = make_checklist(get('Checklist'), get('Next_item_id'))
+        task.next_item_id = item_counter(task.checklist, get('Next_item_id'))
+        task.predecessors = make_predecessors(get('Predecessors'))
+        task.progress = get('Progress', 0)
+        task.created_by = _intern(get('Created_by'))
+        task.created_at = get('Created_at')
+        task.last_modified = get('last_modified')
+        task.version = get('version')
+        task.extra = {key: value for key, value in data.items() if key not in TASK_FIELDS} or None
+        return task
+
+    def to_dict(self):
+        """轉回 JSON 記錄（日期仍為 date，由序列化時轉成字串）"""
+        data = dict(self.items())
+        data['Checklist'] = [item.to_dict() for item in self.checklist]
+        return data
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        """依 JSON 欄位名稱列出有值的欄位"""
+        for key, attr in TASK_FIELDS.items():
+            value = getattr(self, attr)
+            if value is not None:
+                yield key, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def __getitem__(self, key):
+        attr = TASK_FIELDS.get(key)
+        if attr is None:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        value = getattr(self, attr)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        attr = TASK_FIELDS.get(key)
+        if attr is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        elif attr in ('start', 'finish'):
+            setattr(self, attr, to_date(value))
+        elif attr in ('status', 'category', 'created_by'):
+            setattr(self, attr, _intern(value))
+        elif attr == 'checklist':
+            self.checklist = make_checklist(value, self.next_item_id)
+            self.next_item_id = item_counter(self.checklist, self.next_item_id)
+        elif attr == 'next_item_id':
+            self.next_item_id = item_counter(self.checklist, value)
+        elif attr == 'predecessors':
+            self.predecessors = make_predecessors(value)
+        else:
+            setattr(self, attr, value)
+
+    def __contains__(self, key):
+        attr = TASK_FIELDS.get(key)
+        if attr is None:
+            return self.extra is not None and key in self.extra
+        return getattr(self, attr) is not None
+
+    def get(self, key, default=None):
+        attr = TASK_FIELDS.get(key)
+        if attr is None:
+            return self.extra.get(key, default) if self.extra else default
+        value = getattr(self, attr)
+        return default if value is None else value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, other=(), **kwargs):
+        """依 JSON 欄位名稱批次更新"""
+        pairs = other.items() if hasattr(other, 'items') else other
+        for key, value in pairs:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __deepcopy__(self, memo):
+        clone = Task.__new__(Task)
+        for attr in self.__slots__:
+            setattr(clone, attr, getattr(self, attr))
+        # 日期與字串不可變，只需複製檢查項目與額外欄位
+        clone.checklist = [ChecklistItem(item.item, item.completed, item.id) for item in self.checklist]
+        clone.extra = copy.deepcopy(self.extra, memo) if self.extra else None
+        return clone
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, name={self.name!r}, status={self.status!r})"
+
+
+class _ChangeLog:
+    """本行程記錄的任務變更，同一數據檔的所有 DataHandler 共用"""
+
+    def __init__(self, version):
+        # (版本, 任務 id)；記錄涵蓋 (floor, known] 之間的所有版本
+        self.entries = deque(maxlen=10000)
+        self.floor = version
+        self.known = version
+        self.lock = threading.Lock()
+
+
+# 數據檔絕對路徑 -> 變更紀錄
+_change_logs = {}
+_change_logs_lock = threading.Lock()
+
 
 class DataHandler:
-    def __init__(self, file_path="data/tasks.json"):
+    def __init__(self, file_path="data/tasks.json", journal=False, compact_threshold=256 * 1024, snapshot=False):
         self.file_path = file_path
+        # 二進位快照：每次寫入 JSON 後另存欄位式快照，啟動時優先讀取；JSON 仍供交換使用
+        self.snapshot = snapshot
+        self.snapshot_path = os.path.splitext(file_path)[0] + ".npz"
+        # 專案工作日曆（每週工作日與假日），與任務數據放在一起
+        self.calendar_path = os.path.splitext(file_path)[0] + ".calendar.json"
+        self._calendar = None
+        # 日誌模式：變更寫入追加式日誌，達到門檻後在背景壓縮成新快照
+        self.journal = journal
+        self.journal_path = file_path + ".journal"
+        self.compact_threshold = compact_threshold
+        # 跨行程檔案鎖；同一行程內以可重入鎖保護
+        self.lock_path = file_path + ".lock"
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._depth = 0
+        self._compactor = None
+        # 最近一次讀寫時檔案上的任務狀態，以檔案 mtime/大小判斷是否仍有效
+        self._disk = None
         self.ensure_data_directory()
+        # 變更通知：版本號存放在數據檔旁，所有實例與行程看到同一個遞增版本；
+        # 每次變更的任務 id 記在行程內共用的紀錄中
+        self.version_path = file_path + ".version"
+        with _change_logs_lock:
+            key = os.path.abspath(file_path)
+            if key not in _change_logs:
+                _change_logs[key] = _ChangeLog(self._read_version())
+            self._changes = _change_logs[key]
 
     def ensure_data_directory(self):
         """確保數據目錄存在"""
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
 
     def date_handler(self, obj):
-        """處理日期序列化"""
+        """處理日期與任務物件序列化"""
         if isinstance(obj, (date, datetime)):
             return obj.isoformat()
+        if isinstance(obj, (Task, ChecklistItem)):
+            return obj.to_dict()
         return obj
 
+    def parse_task(self, task):
+        """把 JSON 記錄轉成 Task（日期字符串轉回日期對象）"""
+        return Task.from_dict(task)
+
+    @contextmanager
+    def locked(self):
+        """取得數據檔的獨佔鎖（可重入，跨行程有效）"""
+        with self._lock:
+            if self._depth == 0:
+                self._lock_file = open(self.lock_path, 'a+')
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    else:
+                        self._lock_file.seek(0)
+                        msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def stat_key(self):
+        """快照與日誌檔的 mtime/大小"""
+        key = []
+        for path in (self.file_path, self.journal_path, self.journal_path + ".compacting"):
+            try:
+                stat = os.stat(path)
+                key.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def current_tasks(self):
+        """在鎖內取得檔案上的最新任務（檔案未變更時不重新解析）
+
+        供寫入前讀取使用：檔案無法解析時拋出 DataLoadError，不會以空集合
+        當作檔案內容。
+        """
+        with self.locked():
+            if self._disk is None or self._disk[0] != self.stat_key():
+                self._disk = (self.stat_key(), self.read_tasks())
+            return self._disk[1]
+
+    @contextmanager
+    def _modifying(self):
+        """在鎖內取得檔案上的集合以修改並寫入
+
+        集合是快取，會先修改再寫入檔案；寫入失敗（磁碟已滿、I/O 錯誤）時
+        丟棄快取，下次重新讀取檔案，不讓未保存的變更留在快取中。
+        """
+        with self.locked():
+            disk = self.current_tasks()
+            try:
+                yield disk
+            except VersionConflict:
+                # 版本檢查在修改之前，快取沒有變動
+                raise
+            except BaseException:
+                self._disk = None
+                raise
+
+    def disk_view(self):
+        """本行程最近寫入後的檔案狀態；檔案已被其他行程改動時回傳 None"""
+        with self.locked():
+            if self._disk is not None and self._disk[0] == self.stat_key():
+                return self._disk[1]
+            return None
+
+    def _read_version(self):
+        """數據檔目前的變更版本（沒有版本檔時為 0）"""
+        try:
+            with open(self.version_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_version(self, version):
+        directory = os.path.dirname(self.version_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tasks-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(str(version))
+            os.replace(tmp_path, self.version_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @property
+    def change_version(self):
+        """數據檔的變更版本，任何實例或行程寫入後都會遞增"""
+        return self._read_version()
+
+    def record_change(self, *task_ids):
+        """記錄一次變更（可含多筆任務）；沒有任務 id 表示整份數據被取代"""
+        with self.locked():
+            current = self._read_version()
+            version = current + 1
+            self._write_version(version)
+            log = self._changes
+            with log.lock:
+                if not task_ids or current != log.known:
+                    # 整份取代，或期間有其他行程寫入：更早的版本無法增量同步
+                    log.entries.clear()
+                    log.floor = version if not task_ids else current
+                for task_id in task_ids:
+                    if len(log.entries) == log.entries.maxlen:
+                        log.floor = log.entries[0][0]
+                    log.entries.append((version, task_id))
+                log.known = version
+            return version
+
+    def changes_since(self, version):
+        """回傳 version 之後變更過的任務 id；需要整份重新載入時回傳 None
+
+        版本不是本行程記錄過的範圍（早於紀錄、尚未發出，或其他行程寫入
+        後紀錄已不完整）時一律回傳 None。
+        """
+        current = self.change_version
+        if version == current:
+            return set()
+        log = self._changes
+        with log.lock:
+            if current != log.known or version < log.floor or version > log.known:
+                return None
+            changed = set()
+            for change_version, task_id in reversed(log.entries):
+                if change_version <= version:
+                    break
+                changed.add(task_id)
+            return changed
+
+    def _write_json(self, tasks):
+        """先寫入暫存檔並 fsync，再以 rename 原子替換，中途當機不會留下截斷的檔案"""
+        self._install(*self._stage(tasks))
+
+    def _stage(self, tasks):
+        """把任務寫入暫存檔（JSON 與二進位快照），回傳 (JSON 暫存檔, 快照暫存檔或 None)
+
+        不需持有檔案鎖；rename 不改變 mtime/大小，快照以暫存 JSON 的狀態
+        標記，替換後仍與 JSON 一致。
+        """
+        directory = os.path.dirname(self.file_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tasks-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(list(tasks), f, ensure_ascii=False, default=self.date_handler, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        snapshot_tmp = None
+        if self.snapshot:
+            from utils.snapshot import stage_snapshot
+
+            try:
+                stat = os.stat(tmp_path)
+                snapshot_tmp = stage_snapshot(self.snapshot_path, tasks, (stat.st_mtime_ns, stat.st_size))
+            except Exception as e:
+                print(f"寫入二進位快照時出錯: {e}")
+        return tmp_path, snapshot_tmp
+
+    def _install(self, tmp_path, snapshot_tmp=None):
+        """以暫存檔替換 JSON 與二進位快照（需在鎖內呼叫）"""
+        try:
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            self._discard(tmp_path, snapshot_tmp)
+            raise
+        directory = os.path.dirname(self.file_path) or '.'
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        if snapshot_tmp is not None:
+            os.replace(snapshot_tmp, self.snapshot_path)
+
+    @staticmethod
+    def _discard(*paths):
+        """移除未使用的暫存檔"""
+        for path in paths:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    def _json_stamp(self):
+        """JSON 檔的 mtime/大小，用來確認二進位快照是否對應同一份內容"""
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _write_binary(self, tasks):
+        """在 JSON 旁寫入二進位快照（失敗不影響 JSON 保存）"""
+        from utils.snapshot import write_snapshot
+
+        try:
+            write_snapshot(self.snapshot_path, tasks, self._json_stamp())
+        except Exception as e:
+            print(f"寫入二進位快照時出錯: {e}")
+
+    def _read_binary(self):
+        """讀取與 JSON 一致的二進位快照，沒有或已過期時回傳 None"""
+        from utils.snapshot import read_snapshot
+
+        try:
+            return read_snapshot(self.snapshot_path, self._json_stamp())
+        except Exception as e:
+            print(f"讀取二進位快照時出錯: {e}")
+            return None
+
     def save_tasks(self, tasks):
-        """保存任務數據到文件"""
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, ensure_ascii=False, default=self.date_handler, indent=2)
+        """保存任務數據到文件（整份覆蓋，並清除已被取代的日誌）"""
+        with self.locked():
+            self._write_json(tasks)
+            for path in (self.journal_path, self.journal_path + ".compacting"):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._disk = None
+            self.record_change()
 
-    def load_tasks(self):
-        """從文件加載任務數據"""
-        try:
-            if os.path.exists(self.file_path):
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    tasks = json.load(f)
-                    # 轉換日期字符串回日期對象
-                    for task in tasks:
-                        task['Start'] = datetime.fromisoformat(task['Start']).date()
-                        task['Finish'] = datetime.fromisoformat(task['Finish']).date()
-                    return tasks
-            return []
+    def read_tasks(self):
+        """從文件讀取任務數據，無法解析時拋出 DataLoadError"""
+        try:
+            with self.locked():
+                tasks = TaskCollection()
+                if os.path.exists(self.file_path):
+                    stored = self._read_binary() if self.snapshot else None
+                    if stored is not None:
+                        tasks.extend(stored)
+                    else:
+                        with open(self.file_path, 'r', encoding='utf-8') as f:
+                            # 轉換日期字符串回日期對象
+                            for task in json.load(f):
+                                tasks.add(self.parse_task(task))
+                        if self.snapshot:
+                            # JSON 被外部修改或尚無快照時補寫，下次啟動即可直接讀取
+                            self._write_binary(tasks)
+                if self.journal:
+                    self.replay_journal(tasks)
+                return tasks
         except Exception as e:
+            raise DataLoadError(f"無法解析數據檔 {self.file_path}: {e}") from e
+
+    def load_tasks(self):
+        """從文件加載任務數據（供顯示用，無法解析時回傳空集合）"""
+        try:
+            return self.read_tasks()
+        except DataLoadError as e:
             print(f"加載數據時出錯: {e}")
-            return []
+            return TaskCollection()
+
+    def load_calendar(self):
+        """讀取專案工作日曆（檔案未變更時沿用；沒有設定時為週一到週五、無假日）"""
+        from utils.work_calendar import WorkCalendar
+
+        try:
+            stat = os.stat(self.calendar_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            key = None
+        if self._calendar is None or self._calendar[0] != key:
+            calendar = WorkCalendar()
+            if key is not None:
+                try:
+                    with open(self.calendar_path, 'r', encoding='utf-8') as f:
+                        calendar = WorkCalendar.from_dict(json.load(f))
+                except Exception as e:
+                    print(f"讀取工作日曆時出錯: {e}")
+            self._calendar = (key, calendar)
+        return self._calendar[1]
+
+    def save_calendar(self, calendar):
+        """保存專案工作日曆（原子替換）"""
+        directory = os.path.dirname(self.calendar_path) or '.'
+        with self.locked():
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tasks-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(calendar.to_dict(), f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.calendar_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
 
     def add_task(self, tasks, new_task):
-        """添加新任務並保存"""
-        tasks.append(new_task)
-        self.save_tasks(tasks)
+        """添加新任務並保存（id 取檔案與 session 中較大者，避免跨行程重複）"""
+        new_task = Task.from_dict(new_task)
+        with self._modifying() as disk:
+            if new_task.get('id') is None or new_task['id'] in disk:
+                new_task['id'] = max(disk.next_id(), tasks.next_id())
+            new_task['version'] = 1
+            stored = disk.add(copy.deepcopy(new_task))
+            self._persist(disk, [{'op': 'add', 'task': stored}], [new_task['id']])
+        tasks.add(new_task)
         return tasks
 
-    def update_task(self, tasks, task_id, updates):
-        """更新任務並保存"""
-        for task in tasks:
-            if task['id'] == task_id:
-                task.update(updates)
-                task['last_modified'] = datetime.now().isoformat()
-                break
-        self.save_tasks(tasks)
+    def update_task(self, tasks, task_id, updates, base=None):
+        """更新任務並保存
+
+        以任務的 version 做樂觀並行控制：檔案上的版本與 session 讀到的
+        不同時，若對方沒有改到相同欄位（需提供修改前的 base）就合併，
+        否則拋出 VersionConflict。
+        """
+        session_task = tasks.get(task_id)
+        expected = (base or session_task or {}).get('version', 0)
+        with self._modifying() as disk:
+            current = disk.get(task_id)
+            if current is None:
+                raise VersionConflict(task_id)
+            check_version(task_id, current, updates, base, expected)
+            merged = self._commit_update(disk, current, task_id, updates)
+        if session_task is not None:
+            tasks.replace(task_id, merged)
         return tasks
 
-    def delete_task(self, tasks, task_id):
+    def update_checklist(self, tasks, task_id, changes):
+        """把一組檢查項目變更套用到檔案上的最新內容，以單一寫入保存
+
+        變更以項目 id 套用，其他 session 同時修改過的檢查項目也能合併。
+        """
+        with self._modifying() as disk:
+            current = disk.get(task_id)
+            if current is None:
+                raise VersionConflict(task_id)
+            merged = self._commit_update(disk, current, task_id, changes.updates(current))
+        if task_id in tasks:
+            tasks.replace(task_id, merged)
+        return tasks
+
+    def _commit_update(self, disk, current, task_id, updates):
+        """遞增版本並寫入一筆更新，回傳更新後任務的副本"""
+        task, op = self._apply_update(disk, current, task_id, updates)
+        self._persist(disk, [op], [task_id])
+        return copy.deepcopy(task)
+
+    def _apply_update(self, disk, current, task_id, updates):
+        """在檔案上的集合套用更新並遞增版本，回傳 (更新後的任務, 日誌記錄)"""
+        updates = dict(
+            updates,
+            version=current.get('version', 0) + 1,
+            last_modified=datetime.now().isoformat(),
+        )
+        # 複製後替換而不就地修改，背景壓縮持有的參照不受影響
+        task = copy.deepcopy(current)
+        task.update(copy.deepcopy(updates))
+        disk.replace(task_id, task)
+        return task, {'op': 'update', 'id': task_id, 'updates': updates}
+
+    def delete_task(self, tasks, task_id, expected_version=None):
         """刪除任務並保存"""
-        tasks = [task for task in tasks if task['id'] != task_id]
-        self.save_tasks(tasks)
-        return tasks
\ No newline at end of file
+        with self._modifying() as disk:
+            current = disk.get(task_id)
+            if current is not None:
+                if expected_version is not None and current.get('version', 0) != expected_version:
+                    raise VersionConflict(task_id, copy.deepcopy(current))
+                disk.remove(task_id)
+                self._persist(disk, [{'op': 'delete', 'id': task_id}], [task_id])
+        tasks.remove(task_id)
+        return tasks
+
+    def write_batch(self, ops):
+        """以一次讀取、一次寫入保存一批變更（寫入延遲層與大量匯入用）
+
+        ops 依序為 ('add', 任務, 下一個 id)、('update', id, 欄位, 基準) 或
+        ('delete', id)，規則與 add_task、update_task、delete_task 相同。
+        回傳每筆的結果：保存後的任務、None（刪除）或 VersionConflict。
+        新增的任務物件直接放入檔案上的集合，回傳的任務與檔案共用，
+        呼叫端不可就地修改。同批中被重新分配 id 的新任務，之後以原 id
+        指定的更新與刪除會套用到新 id。
+        """
+        results, journal, changed, renamed = [], [], [], {}
+        with self._modifying() as disk:
+            for op in ops:
+                kind = op[0]
+                if kind == 'add':
+                    _, new_task, next_id = op
+                    new_task = Task.from_dict(new_task)
+                    original = new_task.get('id')
+                    if original is None or original in disk:
+                        new_task['id'] = max(disk.next_id(), next_id)
+                        if original is not None:
+                            renamed[original] = new_task['id']
+                    new_task['version'] = 1
+                    disk.add(new_task)
+                    journal.append({'op': 'add', 'task': new_task})
+                    changed.append(new_task['id'])
+                    results.append(new_task)
+                    continue
+                task_id = renamed.get(op[1], op[1])
+                current = disk.get(task_id)
+                if kind == 'update':
+                    _, _, updates, base = op
+                    try:
+                        if current is None:
+                            raise VersionConflict(task_id)
+                        check_version(task_id, current, updates, base, (base or {}).get('version', 0))
+                    except VersionConflict as e:
+                        results.append(e)
+                        continue
+                    task, entry = self._apply_update(disk, current, task_id, updates)
+                    journal.append(entry)
+                    results.append(task)
+                else:
+                    results.append(None)
+                    if current is None:
+                        continue
+                    disk.remove(task_id)
+                    journal.append({'op': 'delete', 'id': task_id})
+                changed.append(task_id)
+            if journal:
+                self._persist(disk, journal, changed)
+        return results
+
+    def _persist(self, disk, ops, task_ids):
+        """把一批變更寫入檔案（日誌模式一次追加，否則原子覆寫快照）"""
+        if self.journal:
+            self.append_journal(ops, disk)
+        else:
+            self._write_json(disk)
+        self._disk = (self.stat_key(), disk)
+        self.record_change(*task_ids)
+
+    # ---- 日誌模式 ----
+
+    def append_journal(self, ops, tasks):
+        """追加一批變更到日誌（單次寫入與 fsync），超過門檻時觸發壓縮"""
+        lines = ''.join(json.dumps(op, ensure_ascii=False, default=self.date_handler) + '\n' for op in ops)
+        with self.locked():
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            size = os.path.getsize(self.journal_path)
+            if size >= self.compact_threshold:
+                self.compact(tasks)
+
+    def replay_journal(self, tasks):
+        """依序重放日誌（含壓縮中的舊日誌）到快照上"""
+        for path in (self.journal_path + ".compacting", self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # 寫入中斷留下的半行，忽略
+                        continue
+                    # 所有操作皆以 id 為準且可重複套用，壓縮中斷後重放也不會重複
+                    if op['op'] == 'add':
+                        tasks.add(self.parse_task(op['task']))
+                    elif op['op'] == 'update':
+                        tasks.update(op['id'], op['updates'])
+                    elif op['op'] == 'delete':
+                        tasks.remove(op['id'])
+        return tasks
+
+    def compact(self, tasks, background=True):
+        """把日誌折疊成新快照"""
+        with self.locked():
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if not os.path.exists(self.journal_path):
+                return
+            if os.path.exists(self.journal_path + ".compacting"):
+                # 上次壓縮未完成（行程中斷），直接以目前狀態整份寫回
+                self.save_tasks(tasks)
+                return
+            # 先輪替日誌，之後的變更寫入新的日誌檔
+            os.replace(self.journal_path, self.journal_path + ".compacting")
+            # 檔案上的任務只整個替換、不就地修改（見 _commit_update），保留參照即可
+            snapshot = list(tasks)
+            if background:
+                self._compactor = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+                self._compactor.start()
+        if not background:
+            self._write_snapshot(snapshot)
+
+    def _write_snapshot(self, snapshot):
+        """在鎖外寫好新快照，只在替換檔案與移除已折疊的日誌時持鎖"""
+        staged = self._stage(snapshot)
+        with self.locked():
+            # 期間若已被整份覆蓋（save_tasks），這份快照已過期
+            if not os.path.exists(self.journal_path + ".compacting"):
+                self._discard(*staged)
+                return
+            current = self._disk is not None and self._disk[0] == self.stat_key()
+            self._install(*staged)
+            os.remove(self.journal_path + ".compacting")
+            # 壓縮不改變內容，原本有效的檔案狀態仍然有效
+            if current:
+                self._disk = (self.stat_key(), self._disk[1])
@@ -0,0 +1,237 @@
+# utils/detail_view.py
+import streamlit as st
+from datetime import timedelta
+from utils.checklist_edit import ChecklistChanges
+
+# 任務詳情的顯示與編輯，主頁的詳情檢視與詳情頁共用
+
+# 前置任務選單最多列出的候選任務數（大型專案不把全部任務送到瀏覽器）
+PREDECESSOR_OPTIONS = 50
+
+
+def edit_task(task_id):
+    """取得可修改的任務，並更新詳情頁顯示的任務"""
+    task = st.session_state.tasks.writable(task_id)
+    st.session_state.current_task = task
+    return task
+
+
+def save_later():
+    """排程保存修改（片段重跑不會經過主頁的同步或詳情頁開頭的保存）"""
+    writer = st.session_state.get('write_behind')
+    if writer is not None and writer.tasks is st.session_state.tasks:
+        writer.flush()
+
+
+def set_status(task_id, key):
+    edit_task(task_id).status = st.session_state[key]
+    save_later()
+
+
+def set_notes(task_id, key):
+    edit_task(task_id).notes = st.session_state[key]
+    save_later()
+
+
+def set_predecessors(task_id, key):
+    tasks = st.session_state.tasks
+    predecessors = st.session_state[key]
+    if tasks.schedule.would_cycle(task_id, predecessors):
+        # 還原選項，並在片段重跑時顯示提示
+        st.session_state[key] = [p for p in tasks.get(task_id).predecessors if p in tasks]
+        st.session_state[f"cycle_{task_id}"] = True
+        return
+    edit_task(task_id).predecessors = tuple(predecessors)
+    save_later()
+
+
+def predecessor_options(tasks, selected, query, start=None, exclude=None):
+    """前置任務選單的選項：已選的任務加上至多 PREDECESSOR_OPTIONS 筆候選
+
+    有搜尋字串時候選為搜尋結果，否則為開始日前 30 天內進行中的任務
+    （結束日期較晚的優先）。
+    """
+    options = [task_id for task_id in dict.fromkeys(selected) if task_id in tasks]
+    if query:
+        candidates = tasks.search(query, PREDECESSOR_OPTIONS + len(options) + 1)
+    elif start is not None:
+        candidates = sorted(tasks.overlapping(start - timedelta(days=30), start),
+                            key=lambda task: task.finish, reverse=True)
+    else:
+        candidates = []
+    chosen = set(options)
+    extra = [task.id for task in candidates if task.id != exclude and task.id not in chosen]
+    return options + extra[:PREDECESSOR_OPTIONS]
+
+
+def show_schedule(task_id, current_task):
+    """工作天數、前置任務與要徑排程結果（最早/最晚日期、總浮時）"""
+    tasks = st.session_state.tasks
+    calendar = st.session_state.get('calendar')
+    if calendar is not None and current_task.start and current_task.finish:
+        days = int(calendar.working_days(current_task.start, current_task.finish))
+        st.write(f"**工作天數:** {days} 天（不含休息日與假日）")
+    timing = tasks.schedule.timing(task_id)
+    if timing is not None:
+        st.write(f"**最早開始/完成:** {timing.early_start} ~ {timing.early_finish}")
+        st.write(f"**最晚開始/完成:** {timing.late_start} ~ {timing.late_finish}")
+        st.write(f"**總浮時:** {timing.total_float} 天" + ("（關鍵任務）" if timing.total_float == 0 else ""))
+
+    predecessors = [p for p in current_task.predecessors if p in tasks]
+    if st.session_state.role == "admin":
+        key = f"predecessors_{task_id}_{current_task.predecessors}"
+        # 以 session state 設定初始值，循環時回呼才能還原選項
+        if key not in st.session_state:
+            st.session_state[key] = predecessors
+        query = st.text_input("搜尋前置任務", key=f"predecessor_query_{task_id}",
+                              placeholder="輸入名稱搜尋；未搜尋時列出開始日前 30 天內的任務").strip()
+        st.multiselect(
+            "前置任務",
+            predecessor_options(tasks, st.session_state[key], query, current_task.start, exclude=task_id),
+            format_func=lambda other: tasks.get(other).name,
+            key=key,
+            on_change=set_predecessors,
+            args=(task_id, key),
+        )
+        if st.session_state.pop(f"cycle_{task_id}", False):
+            st.warning("前置任務會形成循環，未保存修改")
+    else:
+        names = "、".join(tasks.get(p).name for p in predecessors)
+        st.write(f"**前置任務:** {names or '無'}")
+
+
+def save_checklist(task_id, changes):
+    """以單一寫入套用整批檢查項目變更"""
+    writer = st.session_state.get('write_behind')
+    if writer is not None and writer.tasks is st.session_state.tasks:
+        writer.apply_checklist(task_id, changes)
+        for message in writer.pop_conflicts():
+            st.warning(f"{message}，已載入最新內容")
+        if writer.error:
+            st.error(f"{writer.error}，修改尚未保存")
+    else:
+        task = edit_task(task_id)
+        task.update(changes.updates(task))
+    st.session_state.current_task = st.session_state.tasks.get(task_id)
+
+
+def checklist_frame(checklist):
+    """檢查項目轉成編輯表格（明確指定型別，沒有項目時欄位才不會變成浮點數）"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        'id': [item.id for item in checklist],
+        '完成': [item.completed for item in checklist],
+        '檢查項目': [item.item for item in checklist],
+        '順序': list(range(1, len(checklist) + 1)),
+    }).astype({'id': 'Int64', '完成': bool, '檢查項目': object, '順序': 'Int64'})
+
+
+def edited_rows(edited):
+    """編輯表格轉成 [(id 或 None, 內容, 勾選狀態)]，依「順序」欄排序（未填的排在最後）"""
+    import pandas as pd
+
+    # 「順序」為 Int64，不能以 inf 補值，直接把缺值排在最後
+    edited = edited.sort_values('順序', na_position='last', kind='stable')
+    rows = []
+    for item_id, text, completed in zip(edited['id'], edited['檢查項目'], edited['完成']):
+        item_id = None if pd.isna(item_id) else int(item_id)
+        text = '' if pd.isna(text) else str(text).strip()
+        rows.append((item_id, text, bool(completed) if not pd.isna(completed) else False))
+    return rows
+
+
+@st.fragment
+def show_task_panel(task_id):
+    """基本信息、狀態與注意事項（互動時只重跑此片段）"""
+    current_task = st.session_state.tasks.get(task_id)
+    if current_task is None:
+        st.warning("任務已被刪除")
+        return
+
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.subheader("基本信息")
+        st.write(f"**開始日期:** {current_task.start}")
+        st.write(f"**結束日期:** {current_task.finish}")
+        st.write(f"**任務類別:** {current_task.category}")
+        show_schedule(task_id, current_task)
+        
+        # 只有管理員可以更改狀態
+        if st.session_state.role == "admin":
+            key = f"status_{task_id}_{current_task.status}"
+            st.selectbox(
+                "當前狀態",
+                ["未開始", "進行中", "已完成"],
+                index=["未開始", "進行中", "已完成"].index(current_task.status),
+                key=key,
+                on_change=set_status,
+                args=(task_id, key),
+            )
+        else:
+            st.write(f"**當前狀態:** {current_task.status}")
+    
+    with col2:
+        st.subheader("注意事項")
+        if st.session_state.role == "admin":
+            st.text_area(
+                "編輯注意事項",
+                value=current_task.notes,
+                height=200,
+                key=f"notes_{task_id}",
+                on_change=set_notes,
+                args=(task_id, f"notes_{task_id}"),
+            )
+        else:
+            st.write(current_task.notes or '無注意事項')
+
+
+@st.fragment
+def show_checklist_panel(task_id):
+    """任務進度與檢查項目（整批編輯，送出時只重跑此片段）"""
+    current_task = st.session_state.tasks.get(task_id)
+    if current_task is None:
+        return
+
+    st.header("檢查項目列表")
+    if current_task.checklist:
+        completed = sum(1 for item in current_task.checklist if item.completed)
+        total = len(current_task.checklist)
+        progress = (completed / total) * 100
+        st.progress(progress / 100, text=f"完成進度: {progress:.1f}%（已完成 {completed} / 總項目 {total}，待完成 {total - completed}）")
+    else:
+        st.write("尚未添加檢查項目")
+
+    if st.session_state.role != "admin":
+        for item in current_task.checklist:
+            col1, col2 = st.columns([0.1, 1])
+            with col1:
+                st.write("✓" if item.completed else "○")
+            with col2:
+                st.write(item.item)
+        return
+
+    # 勾選、改名、排序、新增（表格最後一列）與刪除都先在表格中完成，送出時一次保存
+    rows = checklist_frame(current_task.checklist)
+    with st.form(f"checklist_form_{task_id}"):
+        edited = st.data_editor(
+            rows,
+            # 檢查項目內容變更（含其他操作造成的）時重建表格
+            key=f"checklist_editor_{task_id}_{hash(tuple((item.id, item.item, item.completed) for item in current_task.checklist))}",
+            hide_index=True,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                'id': None,
+                '完成': st.column_config.CheckboxColumn(default=False, width="small"),
+                '檢查項目': st.column_config.TextColumn(required=True),
+                '順序': st.column_config.NumberColumn(min_value=1, step=1, width="small"),
+            },
+        )
+        submitted = st.form_submit_button("保存檢查項目", type="primary")
+    if submitted:
+        changes = ChecklistChanges.diff(current_task.checklist, edited_rows(edited))
+        if changes:
+            save_checklist(task_id, changes)
+            st.rerun(scope="fragment")
@@ -0,0 +1,163 @@
+# utils/facet_index.py
+import numpy as np
+
+# 可篩選的任務欄位（Task 屬性）
+FACETS = ('status', 'category', 'created_by')
+
+
+class FacetIndex:
+    """多維篩選索引：每個欄位值對應一個布林遮罩，組合篩選以位元運算完成
+
+    每個任務占用一個固定的列位置（依加入順序），刪除只清除該列；空
+    列過多時整理一次。複製時遮罩與原索引共用，第一次修改才複製。
+    """
+
+    def __init__(self, tasks=()):
+        tasks = list(tasks)
+        self._size = len(tasks)
+        capacity = max(64, self._size)
+        # 列位置 -> 任務 id（已刪除為 None），任務 id -> (列位置, 各欄位值)
+        self._row_ids = [task.id for task in tasks]
+        self._rows = {task.id: (row, tuple(getattr(task, facet) for facet in FACETS))
+                      for row, task in enumerate(tasks)}
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:self._size] = True
+        self._masks = {}
+        for i, facet in enumerate(FACETS):
+            codes, lookup = np.zeros(capacity, dtype=np.int32), {}
+            codes[:self._size] = [lookup.setdefault(values[i], len(lookup)) for _, values in self._rows.values()]
+            masks = {}
+            for value, code in lookup.items():
+                mask = codes == code
+                mask[self._size:] = False
+                masks[value] = mask
+            self._masks[facet] = masks
+        self._owned = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def copy(self):
+        """複製索引，遮罩共用到被修改為止"""
+        clone = FacetIndex.__new__(FacetIndex)
+        clone._size = self._size
+        clone._row_ids = list(self._row_ids)
+        clone._rows = dict(self._rows)
+        clone._alive = self._alive.copy()
+        clone._masks = {facet: dict(masks) for facet, masks in self._masks.items()}
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def _mask(self, facet, value):
+        """取得可修改的遮罩"""
+        masks = self._masks[facet]
+        mask = masks.get(value)
+        if mask is None:
+            mask = masks[value] = np.zeros(len(self._alive), dtype=bool)
+        elif self._owned is not None and (facet, value) not in self._owned:
+            mask = masks[value] = mask.copy()
+        if self._owned is not None:
+            self._owned.add((facet, value))
+        return mask
+
+    def _grow(self):
+        """列位置用完時加倍容量"""
+        capacity = len(self._alive) * 2
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[self._size:] = False
+        for masks in self._masks.values():
+            for value, mask in masks.items():
+                grown = np.zeros(capacity, dtype=bool)
+                grown[:len(mask)] = mask
+                masks[value] = grown
+        # 新陣列皆為自己所有
+        self._owned = None
+
+    def add(self, task):
+        """加入或更新任務的欄位值（已存在的任務保留原列位置）"""
+        values = tuple(getattr(task, facet) for facet in FACETS)
+        entry = self._rows.get(task.id)
+        if entry is not None:
+            row, old = entry
+            if old == values:
+                return
+            self._clear(row, old)
+        else:
+            if self._size == len(self._alive):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._row_ids.append(task.id)
+            self._alive[row] = True
+        self._rows[task.id] = (row, values)
+        for facet, value in zip(FACETS, values):
+            self._mask(facet, value)[row] = True
+
+    def remove(self, task_id):
+        """移除任務"""
+        entry = self._rows.pop(task_id, None)
+        if entry is None:
+            return
+        row, values = entry
+        self._clear(row, values)
+        self._alive[row] = False
+        self._row_ids[row] = None
+        if self._size > 1024 and len(self._rows) * 2 < self._size:
+            self._compact()
+
+    def _clear(self, row, values):
+        """清除某列在各欄位值遮罩中的位元，不再有任務的值一併移除"""
+        for facet, value in zip(FACETS, values):
+            mask = self._mask(facet, value)
+            mask[row] = False
+            if not mask.any():
+                del self._masks[facet][value]
+
+    def _compact(self):
+        """移除已刪除任務留下的空列"""
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._size = len(keep)
+        capacity = max(64, self._size * 2)
+        self._row_ids = [self._row_ids[row] for row in keep.tolist()]
+        self._rows = {task_id: (row, self._rows[task_id][1]) for row, task_id in enumerate(self._row_ids)}
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:self._size] = True
+        for masks in self._masks.values():
+            for value, mask in masks.items():
+                compacted = np.zeros(capacity, dtype=bool)
+                compacted[:self._size] = mask[keep]
+                masks[value] = compacted
+        self._owned = None
+
+    def selection(self, filters):
+        """篩選條件 {欄位: [值, ...]} 的布林遮罩：同欄位取聯集，跨欄位取交集"""
+        size = self._size
+        selected = self._alive[:size].copy()
+        for facet, values in filters.items():
+            if not values:
+                continue
+            masks = self._masks[facet]
+            matched = np.zeros(size, dtype=bool)
+            for value in values:
+                mask = masks.get(value)
+                if mask is not None:
+                    matched |= mask[:size]
+            selected &= matched
+        return selected
+
+    def select(self, filters):
+        """符合篩選條件的任務 id（依加入順序）"""
+        row_ids = self._row_ids
+        return [row_ids[row] for row in np.flatnonzero(self.selection(filters)).tolist()]
+
+    def counts(self, facet, filters=None):
+        """各欄位值的任務數；提供 filters 時只計算其他欄位條件下的任務"""
+        size = self._size
+        within = None
+        if filters:
+            within = self.selection({key: values for key, values in filters.items() if key != facet})
+        return {
+            value: int(np.count_nonzero(mask[:size] if within is None else mask[:size] & within))
+            for value, mask in self._masks[facet].items()
+        }
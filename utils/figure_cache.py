@@ -0,0 +1,87 @@
+# utils/figure_cache.py
+import os
+import threading
+from collections import OrderedDict
+
+# 快取圖表的總大小上限（以序列化後的 JSON 字元數計）
+MAX_SIZE = 64 * 1024 * 1024
+
+# 行程層級的圖表快取：(數據檔, 數據版本, 圖表名稱, 篩選條件, 主題) -> (圖表, 大小)
+_entries = OrderedDict()
+_size = 0
+# 數據檔 -> 目前快取對應的數據版本
+_versions = {}
+# 建立中的圖表，同一張圖同時只由一個 session 建立
+_building = {}
+_lock = threading.Lock()
+
+
+def _freeze(figure):
+    """序列化後重新載入：取得大小，且陣列轉成一般列表，之後每次輸出都比較快"""
+    import plotly.io
+
+    spec = figure.to_json()
+    return plotly.io.from_json(spec), len(spec)
+
+
+def _expire(path, version):
+    """數據版本變更時，移除該數據檔的舊圖表（需在鎖內呼叫）"""
+    global _size
+    if _versions.get(path) == version:
+        return
+    _versions[path] = version
+    for key in [key for key in _entries if key[0] == path and key[1] != version]:
+        _size -= _entries.pop(key)[1]
+
+
+def _store(key, figure, size):
+    """加入圖表，超過大小上限時淘汰最久未使用的圖表（需在鎖內呼叫）"""
+    global _size
+    if size > MAX_SIZE:
+        return
+    _entries[key] = (figure, size)
+    _size += size
+    while _size > MAX_SIZE:
+        _, (_, evicted) = _entries.popitem(last=False)
+        _size -= evicted
+
+
+def get_figure(data_handler, version, name, view, build):
+    """取得共用圖表，沒有快取時呼叫 build() 建立
+
+    version 為呼叫端任務集合對應的數據版本（task_cache.get_tasks 回傳
+    的版本）；view 為篩選條件與主題等影響圖表的參數。版本存放在數據
+    檔旁，任何 DataHandler 實例或行程寫入後舊版本的圖表即失效；呼叫端
+    的任務已落後於最新數據時只建立不快取。回傳的圖表由所有 session
+    共用，不可修改。
+    """
+    path = os.path.abspath(data_handler.file_path)
+    key = (path, version, name, view)
+    with _lock:
+        current = data_handler.change_version
+        _expire(path, current)
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            return entry[0]
+        if version != current:
+            building = None
+        else:
+            building = _building.setdefault(key, threading.Lock())
+    if building is None:
+        return build()
+
+    with building:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                _entries.move_to_end(key)
+                return entry[0]
+        figure = build()
+        figure, size = _freeze(figure) if figure is not None else (None, 0)
+        with _lock:
+            # 建立期間數據有寫入時不保存，避免以舊內容佔用新版本的鍵
+            if data_handler.change_version == version:
+                _store(key, figure, size)
+            _building.pop(key, None)
+        return figure
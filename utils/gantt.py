@@ -0,0 +1,130 @@
+# utils/gantt.py
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# 超過此任務數改用 WebGL 線段繪製
+WEBGL_THRESHOLD = 1000
+# 超過此任務數不顯示任務名稱刻度
+LABEL_LIMIT = 200
+OTHER_COLOR = 'rgb(150, 150, 150)'
+CRITICAL_COLOR = 'rgb(255, 0, 255)'
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def build_gantt(df, colors, window=None, critical=None, calendar=None, row_height=30, max_height=1200):
+    """以欄位陣列建立甘特圖，每個狀態只產生一條 trace
+
+    df 需包含 Task、Start、Finish、Status 欄位；window 為 (開始, 結束)
+    日期區間，只繪製與區間重疊的任務並把 x 軸限制在該區間。critical
+    為要徑上的任務 id，以外框（大型專案為細線）另成一條 trace 標示。
+    提供 calendar（WorkCalendar）時，提示文字附上各任務的工作天數。
+    """
+    starts = pd.to_datetime(df['Start']).to_numpy(dtype='datetime64[D]')
+    finishes = pd.to_datetime(df['Finish']).to_numpy(dtype='datetime64[D]')
+    names = df['Task'].to_numpy(dtype=object)
+    statuses = df['Status'].to_numpy(dtype=object)
+    on_path = np.isin(df['id'].to_numpy(), list(critical)) if critical else np.zeros(len(names), dtype=bool)
+
+    if window is not None:
+        lo, hi = np.datetime64(window[0], 'D'), np.datetime64(window[1], 'D')
+        visible = (starts <= hi) & (finishes >= lo)
+        starts, finishes = starts[visible], finishes[visible]
+        names, statuses, on_path = names[visible], statuses[visible], on_path[visible]
+
+    # 提示文字用的任務名稱；有工作日曆時附上整批計算的工作天數
+    labels = names
+    if calendar is not None:
+        days = calendar.working_days(starts, np.maximum(starts, finishes)).tolist()
+        labels = np.array([f"{name}（{count} 工作天）" for name, count in zip(names, days)], dtype=object)
+
+    n = len(names)
+    rows = np.arange(n)
+    webgl = n > WEBGL_THRESHOLD
+    fig = go.Figure()
+
+    groups = [(status, color, statuses == status) for status, color in colors.items()]
+    other = ~np.isin(statuses, list(colors))
+    if other.any():
+        groups.append(('其他', OTHER_COLOR, other))
+
+    for status, color, mask in groups:
+        idx = np.flatnonzero(mask)
+        if not len(idx):
+            continue
+        if webgl:
+            fig.add_trace(_segment_trace(status, color, starts[idx], finishes[idx], rows[idx], labels[idx]))
+        else:
+            fig.add_trace(go.Bar(
+                name=status,
+                orientation='h',
+                base=np.datetime_as_string(starts[idx], unit='D'),
+                x=(finishes[idx] - starts[idx]).astype(np.int64) * DAY_MS,
+                y=rows[idx],
+                customdata=np.column_stack([labels[idx], np.datetime_as_string(finishes[idx], unit='D')]),
+                marker_color=color,
+                hovertemplate='%{customdata[0]}<br>%{base|%Y-%m-%d} ~ %{customdata[1]}<extra>' + status + '</extra>',
+            ))
+
+    idx = np.flatnonzero(on_path)
+    if len(idx):
+        if webgl:
+            trace = _segment_trace('關鍵路徑', CRITICAL_COLOR, starts[idx], finishes[idx], rows[idx], labels[idx])
+            trace.line.width = 3
+        else:
+            trace = go.Bar(
+                name='關鍵路徑',
+                orientation='h',
+                base=np.datetime_as_string(starts[idx], unit='D'),
+                x=(finishes[idx] - starts[idx]).astype(np.int64) * DAY_MS,
+                y=rows[idx],
+                marker=dict(color='rgba(0, 0, 0, 0)', line=dict(color=CRITICAL_COLOR, width=2)),
+                hoverinfo='skip',
+            )
+        fig.add_trace(trace)
+
+    # 依可視列數決定高度，大型專案固定高度並以平移/縮放瀏覽其餘列
+    visible_rows = min(n, max(1, (max_height - 400) // row_height))
+    yaxis = dict(autorange=False, range=[visible_rows - 0.5, -0.5], showgrid=True)
+    if n <= LABEL_LIMIT:
+        yaxis.update(tickmode='array', tickvals=rows, ticktext=names)
+    else:
+        yaxis.update(showticklabels=False)
+    xaxis = dict(type='date', showgrid=True)
+    if window is not None:
+        xaxis['range'] = [str(window[0]), str(window[1])]
+
+    fig.update_layout(
+        barmode='overlay',
+        bargap=0.2,
+        height=400 + visible_rows * row_height,
+        xaxis=xaxis,
+        yaxis=yaxis,
+    )
+    return fig
+
+
+def _segment_trace(status, color, starts, finishes, rows, names):
+    """以 None 分隔的粗線段繪製多個任務條（WebGL）"""
+    k = len(rows)
+    x = np.empty(3 * k, dtype=object)
+    x[0::3] = np.datetime_as_string(starts, unit='D')
+    x[1::3] = np.datetime_as_string(finishes, unit='D')
+    x[2::3] = None
+    y = np.empty(3 * k, dtype=object)
+    y[0::3] = rows
+    y[1::3] = rows
+    y[2::3] = None
+    text = np.empty(3 * k, dtype=object)
+    text[0::3] = names
+    text[1::3] = names
+    text[2::3] = None
+    return go.Scattergl(
+        name=status,
+        x=x,
+        y=y,
+        text=text,
+        mode='lines',
+        line=dict(color=color, width=10),
+        hovertemplate='%{text}<br>%{x}<extra>' + status + '</extra>',
+    )
@@ -0,0 +1,283 @@
+# utils/importer.py
+import hashlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from utils.data_handler import Task
+
+REQUIRED_COLUMNS = ['Task', 'Start', 'Finish', 'Category', 'Status']
+
+# Excel 表頭對應：任務欄位 -> 可接受的表頭名稱（依序比對）
+EXCEL_COLUMN_MAP = {
+    'Task': ['Task', '任務名稱', '工作項目', '工作项目'],
+    'Start': ['Start', '開始日期', '計畫開始', '计划开始'],
+    'Finish': ['Finish', '結束日期', '計畫結束', '计划结束'],
+    'Category': ['Category', '任務類別', '類別', '类别'],
+    'Status': ['Status', '任務狀態', '完成狀態', '完成状态'],
+    'Notes': ['Notes', '注意事項', '備註', '备注'],
+}
+
+# 計畫表常見的狀態寫法 -> 系統狀態
+EXCEL_STATUS_MAP = {
+    '未开始': '未開始',
+    '进行中': '進行中',
+    '提前': '已完成',
+    '正常': '已完成',
+    '推迟': '已完成',
+    '提前完成': '已完成',
+    '正常完成': '已完成',
+    '推迟完成': '已完成',
+    '-': None,
+}
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# 合併匯入時比對內容的欄位（檢查項目、備註歷史等系統內資料不受影響）
+MERGE_FIELDS = ['Task', 'Start', 'Finish', 'Category', 'Status', 'Notes']
+
+
+def frame_to_tasks(df, start_id, username, created_at):
+    """把一批資料列以向量化方式驗證並轉成任務記錄
+
+    df 的索引為資料列位置（列號 = 索引 + 2，含標題列）；回傳
+    (任務列表, 錯誤列表)，錯誤為 (列號, 訊息)。
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位: {', '.join(missing)}")
+
+    starts = pd.to_datetime(df['Start'], errors='coerce')
+    finishes = pd.to_datetime(df['Finish'], errors='coerce')
+    names = df['Task'].astype('string').str.strip()
+
+    problems = pd.Series('', index=df.index)
+    problems = problems.mask(finishes < starts, '結束日期早於開始日期')
+    problems = problems.mask(finishes.isna(), '結束日期無效')
+    problems = problems.mask(starts.isna(), '開始日期無效')
+    problems = problems.mask(names.isna() | (names == ''), '缺少任務名稱')
+    invalid = problems != ''
+    errors = [(int(index) + 2, message) for index, message in problems[invalid].items()]
+
+    valid = ~invalid
+    notes = df['Notes'].fillna('').astype(str) if 'Notes' in df.columns else pd.Series('', index=df.index)
+    columns = zip(
+        names[valid].tolist(),
+        starts[valid].dt.date.tolist(),
+        finishes[valid].dt.date.tolist(),
+        df['Category'][valid].fillna('').astype(str).tolist(),
+        df['Status'][valid].fillna('未開始').astype(str).tolist(),
+        notes[valid].tolist(),
+    )
+    tasks = [
+        Task(
+            id=start_id + i,
+            name=name,
+            start=start,
+            finish=finish,
+            category=category,
+            status=status,
+            notes=note,
+            created_by=username,
+            created_at=created_at,
+        )
+        for i, (name, start, finish, category, status, note) in enumerate(columns)
+    ]
+    return tasks, errors
+
+
+def iter_csv_chunks(file, chunksize=20000):
+    """逐批讀取 CSV，每批產生一個 DataFrame，記憶體只保留一批"""
+    yield from pd.read_csv(file, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[''])
+
+
+def _find_header(rows, column_map, scan_rows):
+    """在前幾列中找出表頭，回傳 (表頭列號, {任務欄位: 欄位位置})"""
+    for number, row in enumerate(rows, start=1):
+        headers = {str(value).strip(): i for i, value in enumerate(row) if value is not None}
+        positions = {}
+        for target, names in column_map.items():
+            for name in names:
+                if name in headers:
+                    positions[target] = headers[name]
+                    break
+        if 'Task' in positions and 'Start' in positions and 'Finish' in positions:
+            return number, positions
+        if number >= scan_rows:
+            break
+    raise ValueError("找不到包含任務名稱、開始與結束日期的表頭")
+
+
+def _excel_value(target, value, status_map):
+    """轉換 Excel 儲存格值（日期序號、狀態寫法）"""
+    if target in ('Start', 'Finish') and isinstance(value, (int, float)):
+        return EXCEL_EPOCH + timedelta(days=value)
+    if target == 'Status' and value is not None:
+        return status_map.get(value, value)
+    return value
+
+
+def iter_excel_chunks(file, column_map=None, status_map=None, sheet=None, chunksize=20000, scan_rows=50):
+    """以唯讀串流模式逐列讀取 Excel，每批產生一個 DataFrame
+
+    column_map 覆寫 EXCEL_COLUMN_MAP 中的表頭名稱；沒有任務名稱的列
+    （空白列、合併儲存格的延伸列）會略過。
+    """
+    from openpyxl import load_workbook
+
+    column_map = {**EXCEL_COLUMN_MAP, **(column_map or {})}
+    status_map = {**EXCEL_STATUS_MAP, **(status_map or {})}
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header_row, positions = _find_header(rows, column_map, scan_rows)
+        columns = REQUIRED_COLUMNS + (['Notes'] if 'Notes' in positions else [])
+
+        batch, numbers = [], []
+        for number, row in enumerate(rows, start=header_row + 1):
+            record = [
+                _excel_value(column, row[positions[column]], status_map)
+                if column in positions and positions[column] < len(row) else None
+                for column in columns
+            ]
+            if record[0] is None or str(record[0]).strip() == '':
+                continue
+            batch.append(record)
+            # 索引對應到實際列號，錯誤訊息才會指向正確的儲存格列
+            numbers.append(number - 2)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=columns, index=numbers)
+                batch, numbers = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=numbers)
+    finally:
+        workbook.close()
+
+
+def import_chunks(chunks, tasks, username, on_progress=None):
+    """把逐批資料寫入任務集合
+
+    chunks 逐批產生 DataFrame；每批完成後呼叫
+    on_progress(已匯入筆數, 本批錯誤)。回傳 (匯入筆數, 全部錯誤)。
+    """
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    imported = 0
+    errors = []
+    for chunk in chunks:
+        records, chunk_errors = frame_to_tasks(chunk, tasks.next_id(), username, created_at)
+        tasks.extend(records)
+        imported += len(records)
+        errors.extend(chunk_errors)
+        if on_progress is not None:
+            on_progress(imported, chunk_errors)
+    return imported, errors
+
+
+def content_hash(task, fields):
+    """任務在指定欄位上的內容雜湊"""
+    payload = '\x1f'.join(str(task.get(field, '')) for field in fields)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+
+# 轉成任務時的預設值（與 frame_to_tasks 相同）
+FIELD_DEFAULTS = {'Category': '', 'Status': '未開始', 'Notes': ''}
+
+
+def _key_column(df, field):
+    """以 frame_to_tasks 的方式轉換比對鍵欄位，無效的值（日期錯誤、空白名稱）為 None"""
+    if field not in df.columns:
+        return [FIELD_DEFAULTS.get(field)] * len(df)
+    if field in ('Start', 'Finish'):
+        return [None if pd.isna(value) else value.date() for value in pd.to_datetime(df[field], errors='coerce')]
+    if field == 'Task':
+        names = df['Task'].astype('string').str.strip()
+        return [None if pd.isna(name) or name == '' else str(name) for name in names]
+    return df[field].fillna(FIELD_DEFAULTS.get(field, '')).astype(str).tolist()
+
+
+def _failed_keys(df, rows, key):
+    """驗證失敗的列的比對鍵 [(列號, 鍵)]；鍵欄位本身無效時鍵為 None"""
+    failed = df.loc[[row - 2 for row in rows]]
+    columns = [_key_column(failed, field) for field in key]
+    return [
+        (row, None if any(value is None for value in values) else tuple(values))
+        for row, values in zip(rows, zip(*columns))
+    ]
+
+
+def merge_chunks(chunks, tasks, username, key=('Task',), delete_missing=True, on_progress=None):
+    """以自然鍵比對並合併匯入，只套用真正有變更的新增、更新與刪除
+
+    key 為用來辨識同一任務的欄位；內容以 MERGE_FIELDS 中匯入檔有提供
+    的欄位雜湊比對。比對鍵無法唯一對應時不套用並列為錯誤：匯入檔中
+    重複的鍵只採用第一列，對應到多個現有任務的鍵整組保留不變。
+    驗證失敗的列不套用，但對應的現有任務也不刪除；無法判斷比對鍵
+    （如鍵欄位的日期無效）時整批都不刪除。
+    回傳 ({'inserted', 'updated', 'deleted', 'unchanged'}, 錯誤列表)。
+    """
+    key = tuple(key)
+    existing = {}
+    # 比對鍵 -> 共用此鍵的現有任務 id（兩筆以上）
+    ambiguous = {}
+    for task in tasks:
+        task_key = tuple(task.get(field) for field in key)
+        if task_key in existing:
+            ambiguous.setdefault(task_key, [existing[task_key]]).append(task['id'])
+        else:
+            existing[task_key] = task['id']
+    # 比對鍵 -> 匯入檔中第一次出現的列號
+    seen = {}
+    # 驗證失敗的列的比對鍵（不刪除）、無法判斷比對鍵的第一列
+    kept = set()
+    unknown = None
+    counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    errors = []
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for chunk in chunks:
+        fields = [field for field in MERGE_FIELDS if field in chunk.columns]
+        records, chunk_errors = frame_to_tasks(chunk, 0, username, created_at)
+        # 有效的任務依序對應到沒有錯誤的資料列
+        failed = {row for row, _ in chunk_errors}
+        for row, record_key in _failed_keys(chunk, sorted(failed), key):
+            if record_key is not None:
+                kept.add(record_key)
+            elif unknown is None:
+                unknown = row
+        rows = [row for row in (int(index) + 2 for index in chunk.index) if row not in failed]
+        for row, record in zip(rows, records):
+            record_key = tuple(record.get(field) for field in key)
+            if record_key in seen:
+                chunk_errors.append((row, f"比對鍵與第 {seen[record_key]} 列重複"))
+                continue
+            seen[record_key] = row
+            if record_key in ambiguous:
+                ids = '、'.join(str(task_id) for task_id in ambiguous[record_key])
+                chunk_errors.append((row, f"比對鍵對應到多個現有任務（id {ids}）"))
+                continue
+            task_id = existing.get(record_key)
+            if task_id is None:
+                record['id'] = None
+                existing[record_key] = tasks.add(record)['id']
+                counts['inserted'] += 1
+            elif content_hash(tasks.get(task_id), fields) != content_hash(record, fields):
+                tasks.update(task_id, {field: record[field] for field in fields})
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+        errors.extend(chunk_errors)
+        if on_progress is not None:
+            on_progress(sum(counts.values()), chunk_errors)
+    if delete_missing and unknown is not None:
+        errors.append((unknown, "無法判斷此列的比對鍵，未刪除匯入檔中不存在的任務"))
+    elif delete_missing:
+        present = seen.keys() | kept
+        missing = [task_id for record_key, task_id in existing.items() if record_key not in present]
+        missing += [
+            task_id for record_key, task_ids in ambiguous.items() if record_key not in present
+            for task_id in task_ids[1:]
+        ]
+        for task_id in missing:
+            tasks.remove(task_id)
+            counts['deleted'] += 1
+    return counts, errors
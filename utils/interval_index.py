@@ -0,0 +1,194 @@
+# utils/interval_index.py
+import random
+from datetime import date
+
+
+def _ordinal(value):
+    """日期轉成序數（datetime 亦可）"""
+    return value.toordinal() if isinstance(value, date) else None
+
+
+class _Node:
+    """樹節點：建立後不再修改，增刪時只複製搜尋路徑上的節點"""
+
+    __slots__ = ('key', 'end', 'priority', 'left', 'right', 'size', 'high')
+
+    def __init__(self, key, end, priority, left=None, right=None):
+        self.key = key
+        self.end = end
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self._fix()
+
+    def _fix(self):
+        """重新計算子樹大小與子樹中最晚的結束序數"""
+        left, right = self.left, self.right
+        self.size = 1 + (left.size if left else 0) + (right.size if right else 0)
+        high = self.end
+        if left is not None and left.high > high:
+            high = left.high
+        if right is not None and right.high > high:
+            high = right.high
+        self.high = high
+
+
+def _with(node, left, right):
+    return _Node(node.key, node.end, node.priority, left, right)
+
+
+def _split(node, key):
+    """拆成鍵 < key 與鍵 >= key 兩棵樹"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        return _with(node, node.left, left), right
+    left, right = _split(node.left, key)
+    return left, _with(node, right, node.right)
+
+
+def _merge(left, right):
+    """合併兩棵樹（left 的鍵全部小於 right）"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return _with(left, left.left, _merge(left.right, right))
+    return _with(right, _merge(left, right.left), right.right)
+
+
+def _insert(node, key, end):
+    left, right = _split(node, key)
+    return _merge(_merge(left, _Node(key, end, random.random())), right)
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key < node.key:
+        return _with(node, _delete(node.left, key), node.right)
+    if node.key < key:
+        return _with(node, node.left, _delete(node.right, key))
+    return _merge(node.left, node.right)
+
+
+def _build(items):
+    """由依鍵排序的 (鍵, 結束序數) 一次建立樹（右側路徑堆疊，線性時間）"""
+    spine = []
+    for key, end in items:
+        node = _Node(key, end, random.random())
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = spine.pop()
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+    if not spine:
+        return None
+    # 由下而上補算子樹資訊
+    root, order, stack = spine[0], [], [spine[0]]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(child for child in (node.left, node.right) if child is not None)
+    for node in reversed(order):
+        node._fix()
+    return root
+
+
+def _count_below(node, key):
+    """鍵小於 key 的節點數"""
+    count = 0
+    while node is not None:
+        if node.key < key:
+            count += (node.left.size if node.left else 0) + 1
+            node = node.right
+        else:
+            node = node.left
+    return count
+
+
+def _collect(node, lo, hi, out):
+    """依開始日期順序收集與 [lo, hi] 重疊的任務 id；子樹最晚結束早於 lo 時整棵略過"""
+    while node is not None and node.high >= lo:
+        _collect(node.left, lo, hi, out)
+        if node.key[0] > hi:
+            return
+        if node.end >= lo:
+            out.append(node.key[1])
+        node = node.right
+
+
+class IntervalIndex:
+    """任務日期區間索引：以開始日期為鍵的區間樹（treap），可逐筆增刪
+
+    每個節點記錄子樹中最晚的結束日期，查詢重疊任務時略過不可能重疊
+    的子樹，花費約為 O(log n + 結果筆數)，不受個別長工期任務影響；
+    另以結束日期為鍵的樹計算重疊筆數。增刪為 O(log n)，節點不修改、
+    只複製路徑，因此 copy() 不必複製整棵樹。
+    """
+
+    def __init__(self, spans=()):
+        # id -> (開始序數, 結束序數)
+        self._spans = {}
+        for task_id, start, finish in spans:
+            start, finish = _ordinal(start), _ordinal(finish)
+            if start is not None and finish is not None:
+                self._spans[task_id] = (min(start, finish), max(start, finish))
+        # 初次建立時一次排序
+        self._starts = _build(sorted(((start, task_id), finish) for task_id, (start, finish) in self._spans.items()))
+        self._finishes = _build(sorted(((finish, task_id), finish) for task_id, (_, finish) in self._spans.items()))
+
+    def __len__(self):
+        return len(self._spans)
+
+    def copy(self):
+        """複製索引（兩份索引共用不會被修改的樹節點）"""
+        clone = IntervalIndex()
+        clone._spans = dict(self._spans)
+        clone._starts = self._starts
+        clone._finishes = self._finishes
+        return clone
+
+    def add(self, task_id, start, finish):
+        """加入（或更新）任務的日期區間；缺少日期的任務不納入索引"""
+        self.remove(task_id)
+        start, finish = _ordinal(start), _ordinal(finish)
+        if start is None or finish is None:
+            return
+        if finish < start:
+            start, finish = finish, start
+        self._spans[task_id] = (start, finish)
+        self._starts = _insert(self._starts, (start, task_id), finish)
+        self._finishes = _insert(self._finishes, (finish, task_id), finish)
+
+    def remove(self, task_id):
+        """移除任務的日期區間"""
+        span = self._spans.pop(task_id, None)
+        if span is None:
+            return
+        start, finish = span
+        self._starts = _delete(self._starts, (start, task_id))
+        self._finishes = _delete(self._finishes, (finish, task_id))
+
+    def overlapping(self, start, end):
+        """與 [start, end] 重疊的任務 id，依開始日期排序"""
+        lo, hi = _ordinal(start), _ordinal(end)
+        result = []
+        if lo <= hi:
+            _collect(self._starts, lo, hi, result)
+        return result
+
+    def active_on(self, day):
+        """指定日期進行中的任務 id"""
+        return self.overlapping(day, day)
+
+    def count_overlapping(self, start, end):
+        """與 [start, end] 重疊的任務數（開始不晚於 hi 的扣掉在 lo 前已結束的）"""
+        lo, hi = _ordinal(start), _ordinal(end)
+        if lo > hi:
+            return 0
+        return _count_below(self._starts, (hi, float('inf'))) - _count_below(self._finishes, (lo,))
@@ -0,0 +1,355 @@
+# utils/schedule.py
+import heapq
+from collections import namedtuple
+from datetime import date
+
+# 單一任務的排程結果（日期皆含當日，浮時以天計）
+Timing = namedtuple('Timing', ['early_start', 'early_finish', 'late_start', 'late_finish', 'total_float'])
+
+
+def _node(task):
+    """任務的 (開始序數, 工期天數, 前置任務)；缺少日期的任務不納入排程"""
+    if not isinstance(task.start, date) or not isinstance(task.finish, date):
+        return None
+    start, finish = task.start.toordinal(), task.finish.toordinal()
+    if finish < start:
+        start, finish = finish, start
+    return start, finish - start + 1, task.predecessors
+
+
+def _reach(seeds, edges, allowed):
+    """從 seeds 沿 edges 可到達的節點（含 seeds），只走 allowed 成立的節點"""
+    seen = set(seeds)
+    stack = list(seeds)
+    while stack:
+        for node in edges[stack.pop()]:
+            if node not in seen and allowed(node):
+                seen.add(node)
+                stack.append(node)
+    return seen
+
+
+class Schedule:
+    """依前置任務連結計算的要徑排程（CPM），可逐筆更新
+
+    任務之間為完成-開始關係：任務最早在所有前置任務完成的隔天開始，
+    且不早於自己的開始日期；工期取自原本的開始與結束日期。順推得到
+    最早開始/完成，逆推得到最晚開始/完成，兩者之差為總浮時，浮時為
+    0 的任務即要徑。
+
+    任務變更時只沿後續任務順推、沿前置任務逆推到結果不再改變為止。
+    逆推結果以「最晚開始距專案完成的天數」保存，專案完成日改變時不
+    必重算。會形成循環的連結不納入計算，相關任務記在 cyclic；已有被
+    略過的連結時，移除任務或修改前置任務都可能解開循環，此時整份重建
+    以恢復不再形成循環的連結（循環少見，一般修改仍只做增量計算）。
+    """
+
+    def __init__(self, tasks=()):
+        # 任務 id -> 開始序數、工期、設定的前置任務
+        self._start = {}
+        self._duration = {}
+        self._declared = {}
+        for task in tasks:
+            node = _node(task)
+            if node is not None:
+                self._start[task.id], self._duration[task.id], self._declared[task.id] = node
+        self._rebuild()
+
+    def __len__(self):
+        return len(self._start)
+
+    def __contains__(self, task_id):
+        return task_id in self._start
+
+    def _rebuild(self):
+        """重建連結與拓撲順序，並完整順推、逆推一次"""
+        nodes = self._start
+        preds, waiting = {}, {}
+        self.cyclic = set()
+        for task_id, declared in self._declared.items():
+            preds[task_id] = []
+            for pred in declared:
+                if pred == task_id:
+                    self.cyclic.add(task_id)
+                elif pred in nodes:
+                    preds[task_id].append(pred)
+                else:
+                    waiting.setdefault(pred, []).append(task_id)
+
+        # 沿前置任務深度優先走訪，後序即拓撲順序；遇到回邊（循環）略過該連結
+        order, state = [], {}
+        for root in nodes:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(list(preds[root])))]
+            while stack:
+                node, pending = stack[-1]
+                for pred in pending:
+                    if pred not in state:
+                        state[pred] = 1
+                        stack.append((pred, iter(list(preds[pred]))))
+                        break
+                    if state[pred] == 1:
+                        preds[node].remove(pred)
+                        self.cyclic.add(node)
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+
+        succ = {task_id: [] for task_id in nodes}
+        for task_id in order:
+            for pred in preds[task_id]:
+                succ[pred].append(task_id)
+        # 連結以 tuple 保存，修改時整個替換，複製排程時可以直接共用
+        self._preds = {task_id: tuple(values) for task_id, values in preds.items()}
+        self._succ = {task_id: tuple(values) for task_id, values in succ.items()}
+        # 尚不存在的前置任務 id -> 等待它的任務
+        self._waiting = {pred: tuple(values) for pred, values in waiting.items()}
+        self._rank = {task_id: rank for rank, task_id in enumerate(order)}
+        self._next_rank = len(order)
+
+        start, duration = self._start, self._duration
+        self._early = early = {}
+        for task_id in order:
+            value = start[task_id]
+            for pred in self._preds[task_id]:
+                value = max(value, early[pred] + duration[pred])
+            early[task_id] = value
+        self._tail = tail = {}
+        for task_id in reversed(order):
+            following = self._succ[task_id]
+            tail[task_id] = max(tail[s] for s in following) + duration[task_id] if following else duration[task_id] - 1
+        self._changed()
+
+    def _changed(self):
+        """排程結果改變，清除專案完成日與要徑的快取"""
+        self._finish = None
+        self._critical = None
+
+    def copy(self):
+        """複製排程（連結為 tuple，只需複製外層字典）"""
+        clone = Schedule.__new__(Schedule)
+        for name in ('_start', '_duration', '_declared', '_preds', '_succ', '_waiting', '_rank', '_early', '_tail'):
+            setattr(clone, name, dict(getattr(self, name)))
+        clone.cyclic = set(self.cyclic)
+        clone._next_rank = self._next_rank
+        clone._finish = self._finish
+        clone._critical = self._critical
+        return clone
+
+    def add(self, task):
+        """加入或更新任務，只重算受影響的任務"""
+        task_id = task.id
+        node = _node(task)
+        if node is None:
+            self.remove(task_id)
+            return
+        start, duration, declared = node
+        if task_id not in self._start:
+            self._insert(task_id, start, duration, declared)
+        elif declared != self._declared[task_id]:
+            self._start[task_id], self._duration[task_id] = start, duration
+            if self.cyclic - {task_id}:
+                # 其他任務有被略過的連結，可能因這次修改而不再形成循環
+                self._declared[task_id] = declared
+                self._rebuild()
+                return
+            old_preds = self._preds[task_id]
+            self._relink(task_id, declared)
+            self._forward((task_id,))
+            # 原本與新的前置任務的後續任務都改變了
+            self._backward((task_id,) + old_preds + self._preds[task_id])
+        elif start != self._start[task_id] or duration != self._duration[task_id]:
+            resized = duration != self._duration[task_id]
+            self._start[task_id], self._duration[task_id] = start, duration
+            self._forward((task_id,))
+            if resized:
+                self._backward((task_id,))
+        else:
+            return
+        self._changed()
+
+    def _insert(self, task_id, start, duration, declared):
+        self._start[task_id], self._duration[task_id], self._declared[task_id] = start, duration, declared
+        if task_id in self._waiting:
+            # 已有任務以它為前置任務，連結可能形成循環，整份重建
+            self._rebuild()
+            return
+        preds = []
+        for pred in declared:
+            if pred == task_id:
+                self.cyclic.add(task_id)
+            elif pred in self._start:
+                preds.append(pred)
+            else:
+                self._waiting[pred] = self._waiting.get(pred, ()) + (task_id,)
+        # 新任務沒有後續任務，排在拓撲順序最後即可
+        self._preds[task_id] = preds = tuple(preds)
+        self._succ[task_id] = ()
+        for pred in preds:
+            self._succ[pred] += (task_id,)
+        self._rank[task_id] = self._next_rank
+        self._next_rank += 1
+        self._forward((task_id,))
+        self._backward((task_id,) + preds)
+
+    def _relink(self, task_id, declared):
+        """替換任務的前置任務，必要時調整拓撲順序（Pearce-Kelly）"""
+        for pred in self._declared[task_id]:
+            self._unwait(pred, task_id)
+        for pred in self._preds[task_id]:
+            self._succ[pred] = tuple(s for s in self._succ[pred] if s != task_id)
+        self._declared[task_id] = declared
+        self.cyclic.discard(task_id)
+
+        rank = self._rank
+        preds = []
+        for pred in declared:
+            if pred == task_id:
+                self.cyclic.add(task_id)
+            elif pred in self._start:
+                preds.append(pred)
+            else:
+                self._waiting[pred] = self._waiting.get(pred, ()) + (task_id,)
+
+        # 排在此任務之後的新前置任務：若是此任務的後續任務就形成循環，
+        # 否則把兩邊受影響的任務重新分配原本占用的順序位置
+        later = [pred for pred in preds if rank[pred] > rank[task_id]]
+        if later:
+            bound = max(rank[pred] for pred in later)
+            forward = _reach((task_id,), self._succ, lambda node: rank[node] <= bound)
+            if any(pred in forward for pred in later):
+                self.cyclic.add(task_id)
+                preds = [pred for pred in preds if pred not in forward]
+                later = [pred for pred in later if pred not in forward]
+            if later:
+                lower = rank[task_id]
+                backward = _reach(later, self._preds, lambda node: rank[node] > lower)
+                moved = sorted(backward, key=rank.get) + sorted(forward, key=rank.get)
+                for node, slot in zip(moved, sorted(rank[node] for node in moved)):
+                    rank[node] = slot
+
+        self._preds[task_id] = tuple(preds)
+        for pred in preds:
+            self._succ[pred] += (task_id,)
+
+    def _unwait(self, pred, task_id):
+        """task_id 不再等待尚不存在的前置任務 pred"""
+        waiting = self._waiting.get(pred)
+        if waiting is not None and task_id in waiting:
+            waiting = tuple(node for node in waiting if node != task_id)
+            if waiting:
+                self._waiting[pred] = waiting
+            else:
+                del self._waiting[pred]
+
+    def remove(self, task_id):
+        """移除任務，後續任務改為等待它重新出現"""
+        if task_id not in self._start:
+            return
+        preds, following = self._preds.pop(task_id), self._succ.pop(task_id)
+        for pred in self._declared.pop(task_id):
+            self._unwait(pred, task_id)
+        for name in ('_start', '_duration', '_rank', '_early', '_tail'):
+            del getattr(self, name)[task_id]
+        self.cyclic.discard(task_id)
+        if self.cyclic:
+            # 被略過的連結可能經過此任務形成循環，整份重建以恢復連結
+            self._rebuild()
+            return
+        for pred in preds:
+            self._succ[pred] = tuple(s for s in self._succ[pred] if s != task_id)
+        for node in following:
+            self._preds[node] = tuple(p for p in self._preds[node] if p != task_id)
+        if following:
+            self._waiting[task_id] = self._waiting.get(task_id, ()) + following
+        self._forward(following)
+        self._backward(preds)
+        self._changed()
+
+    def _forward(self, seeds):
+        """依拓撲順序重算最早開始，只往結果有改變的後續任務傳遞"""
+        rank, early, start, duration = self._rank, self._early, self._start, self._duration
+        preds, succ = self._preds, self._succ
+        heap = [(rank[node], node) for node in set(seeds)]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, node = heapq.heappop(heap)
+            value = start[node]
+            for pred in preds[node]:
+                value = max(value, early[pred] + duration[pred])
+            # 起點的工期可能改變，即使最早開始相同也要通知後續任務
+            if early.get(node) == value and node not in seeds:
+                continue
+            early[node] = value
+            for following in succ[node]:
+                if following not in queued:
+                    queued.add(following)
+                    heapq.heappush(heap, (rank[following], following))
+
+    def _backward(self, seeds):
+        """依反向拓撲順序重算距專案完成的天數，只往結果有改變的前置任務傳遞"""
+        rank, tail, duration = self._rank, self._tail, self._duration
+        preds, succ = self._preds, self._succ
+        heap = [(-rank[node], node) for node in set(seeds)]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, node = heapq.heappop(heap)
+            following = succ[node]
+            value = max(tail[s] for s in following) + duration[node] if following else duration[node] - 1
+            if tail.get(node) == value:
+                continue
+            tail[node] = value
+            for pred in preds[node]:
+                if pred not in queued:
+                    queued.add(pred)
+                    heapq.heappush(heap, (-rank[pred], pred))
+
+    def _project_finish(self):
+        if self._finish is None:
+            duration = self._duration
+            self._finish = max((early + duration[node] - 1 for node, early in self._early.items()), default=None)
+        return self._finish
+
+    @property
+    def finish(self):
+        """專案最早完成日"""
+        finish = self._project_finish()
+        return date.fromordinal(finish) if finish is not None else None
+
+    def timing(self, task_id):
+        """任務的最早/最晚開始與完成日期及總浮時；不在排程中時回傳 None"""
+        early = self._early.get(task_id)
+        if early is None:
+            return None
+        duration = self._duration[task_id]
+        late = self._project_finish() - self._tail[task_id]
+        return Timing(
+            date.fromordinal(early), date.fromordinal(early + duration - 1),
+            date.fromordinal(late), date.fromordinal(late + duration - 1),
+            late - early,
+        )
+
+    def critical(self):
+        """總浮時為 0 的任務 id"""
+        if self._critical is None:
+            finish, tail = self._project_finish(), self._tail
+            self._critical = frozenset(node for node, early in self._early.items() if early + tail[node] == finish)
+        return self._critical
+
+    def critical_path(self):
+        """要徑上的任務 id，依拓撲順序排列"""
+        return sorted(self.critical(), key=self._rank.get)
+
+    def would_cycle(self, task_id, predecessors):
+        """把 predecessors 設為任務的前置任務是否會形成循環"""
+        if task_id in predecessors:
+            return True
+        if task_id not in self._succ:
+            return False
+        following = _reach((task_id,), self._succ, lambda node: True)
+        return any(pred in following for pred in predecessors)
@@ -0,0 +1,145 @@
+# utils/search_index.py
+import heapq
+import math
+import re
+from collections import Counter
+
+# 中日文字元（CJK 統一表意文字、擴充 A、相容字、注音、假名）
+_CJK = '\u3040-\u30ff\u3100-\u312f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+# 連續的中文字，或連續的其他文字/數字（英文單字、編號）
+_RUN_RE = re.compile(f'[{_CJK}]+|[^\\W{_CJK}_]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+
+# 英數單字額外索引的前綴長度上限（支援輸入到一半的編號、單字）
+PREFIX_LIMIT = 8
+
+# 各欄位命中的權重：任務名稱最重要
+FIELD_WEIGHTS = (('name', 3.0), ('notes', 1.0), ('checklist', 1.0))
+
+
+def _runs(text):
+    """切出中文字串與英數字串，英文不分大小寫"""
+    return _RUN_RE.findall(text.lower()) if text else []
+
+
+def tokenize(text):
+    """索引用詞元：中文取單字與相鄰二字（bigram），英數取整個單字與其前綴"""
+    tokens = []
+    for run in _runs(text):
+        if _CJK_RE.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.extend(run[:i] for i in range(1, min(len(run), PREFIX_LIMIT)))
+            tokens.append(run)
+    return tokens
+
+
+def query_tokens(query):
+    """查詢用詞元：中文以二字詞元比對（單一字時用單字），英數以前綴比對，需全部命中"""
+    tokens = []
+    for run in _runs(query):
+        if _CJK_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def document(task):
+    """任務各欄位的詞元權重"""
+    weights = Counter()
+    texts = {
+        'name': task.name,
+        'notes': task.notes,
+        'checklist': ' '.join(item.item for item in task.checklist),
+    }
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(texts[field]):
+            weights[token] += weight
+    return weights
+
+
+class SearchIndex:
+    """任務名稱、注意事項與檢查項目的倒排索引，可逐筆增刪
+
+    複製時只複製外層字典，各詞元的 posting 在第一次被修改時才複製
+    （copy-on-write），共用集合更新時不必整份重建。
+    """
+
+    def __init__(self, tasks=()):
+        # 詞元 -> {任務 id: 權重}
+        self._postings = {}
+        # 任務 id -> 詞元權重（刪除或更新時用來找回 posting）
+        self._docs = {}
+        self._owned = None
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def copy(self):
+        """複製索引，posting 與原索引共用到被修改為止"""
+        clone = SearchIndex()
+        clone._postings = dict(self._postings)
+        clone._docs = dict(self._docs)
+        clone._owned = set()
+        # 原索引之後的修改也不能影響副本
+        self._owned = set()
+        return clone
+
+    def _posting(self, token):
+        """取得可修改的 posting"""
+        posting = self._postings.get(token)
+        if posting is None:
+            posting = self._postings[token] = {}
+        elif self._owned is not None and token not in self._owned:
+            posting = self._postings[token] = dict(posting)
+        if self._owned is not None:
+            self._owned.add(token)
+        return posting
+
+    def add(self, task):
+        """加入（或重新索引）任務"""
+        self.remove(task.id)
+        weights = document(task)
+        for token, weight in weights.items():
+            self._posting(token)[task.id] = weight
+        self._docs[task.id] = weights
+
+    def remove(self, task_id):
+        """移除任務"""
+        weights = self._docs.pop(task_id, None)
+        if weights is None:
+            return
+        for token in weights:
+            posting = self._posting(token)
+            posting.pop(task_id, None)
+            if not posting:
+                del self._postings[token]
+
+    def search(self, query, limit=None):
+        """回傳符合查詢的任務 id，依相關度（權重 × idf）排序"""
+        tokens = set(query_tokens(query))
+        if not tokens:
+            return []
+        postings = [self._postings.get(token) for token in tokens]
+        if any(not posting for posting in postings):
+            return []
+        # 從最短的 posting 開始取交集
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        total = len(self._docs)
+        idf = [math.log(1 + total / len(posting)) for posting in postings]
+        scores = {
+            task_id: sum(posting[task_id] * weight for posting, weight in zip(postings, idf))
+            for task_id in candidates
+        }
+        if limit is not None:
+            return heapq.nlargest(limit, scores, key=scores.get)
+        return sorted(scores, key=scores.get, reverse=True)
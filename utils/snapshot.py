@@ -0,0 +1,176 @@
+# utils/snapshot.py
+import json
+import os
+import sys
+import tempfile
+from datetime import date
+
+import numpy as np
+
+from utils.data_handler import ChecklistItem, Task
+
+# 二進位快照格式版本，格式變更時遞增，舊快照會被忽略
+FORMAT = 4
+
+# 以字典編碼保存的低基數欄位
+CODED_FIELDS = ('category', 'status', 'created_by')
+# 以 UTF-8 串接保存的字串欄位
+TEXT_FIELDS = ('name', 'notes', 'created_at', 'last_modified')
+
+
+def _encode_text(arrays, name, values):
+    """字串欄位：串接成一段 UTF-8 加上字元位移，None 以遮罩記錄"""
+    texts = ['' if value is None else str(value) for value in values]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(text) for text in texts])
+    arrays[f'{name}__data'] = np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8)
+    arrays[f'{name}__offsets'] = offsets
+    arrays[f'{name}__null'] = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+
+
+def _decode_text(arrays, name):
+    """整段解碼後依位移切回各字串"""
+    text = arrays[f'{name}__data'].tobytes().decode('utf-8')
+    bounds = arrays[f'{name}__offsets'].tolist()
+    values = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+    for i in np.flatnonzero(arrays[f'{name}__null']).tolist():
+        values[i] = None
+    return values
+
+
+def _encode_codes(arrays, name, values):
+    """低基數欄位：每個不同值只存一次，任務只存代碼"""
+    lookup = {}
+    arrays[f'{name}__codes'] = np.fromiter(
+        (lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32, count=len(values)
+    )
+    _encode_text(arrays, f'{name}__values', list(lookup))
+
+
+def _decode_codes(arrays, name):
+    """代碼轉回值（同一值共用同一個字串物件）"""
+    values = [sys.intern(value) if value is not None else None for value in _decode_text(arrays, f'{name}__values')]
+    return [values[code] for code in arrays[f'{name}__codes'].tolist()]
+
+
+def _decode_dates(ordinals):
+    """日期序數轉回 date（0 表示沒有日期，相同日期共用物件）"""
+    unique, inverse = np.unique(ordinals, return_inverse=True)
+    days = [date.fromordinal(ordinal) if ordinal > 0 else None for ordinal in unique.tolist()]
+    return [days[i] for i in inverse.tolist()]
+
+
+def encode(tasks, stamp):
+    """把任務轉成欄位式陣列；stamp 為對應 JSON 檔的 (mtime_ns, 大小)"""
+    tasks = list(tasks)
+    count = len(tasks)
+    arrays = {
+        'format': np.array([FORMAT], dtype=np.int64),
+        'stamp': np.array(stamp, dtype=np.int64),
+        'id': np.fromiter((task.id for task in tasks), dtype=np.int64, count=count),
+        'start': np.fromiter((task.start.toordinal() if task.start else 0 for task in tasks), dtype=np.int32, count=count),
+        'finish': np.fromiter((task.finish.toordinal() if task.finish else 0 for task in tasks), dtype=np.int32, count=count),
+        'progress': np.fromiter((task.progress or 0 for task in tasks), dtype=np.float64, count=count),
+        'version': np.fromiter((-1 if task.version is None else task.version for task in tasks), dtype=np.int64, count=count),
+    }
+    for field in CODED_FIELDS:
+        _encode_codes(arrays, field, [getattr(task, field) for task in tasks])
+    for field in TEXT_FIELDS:
+        _encode_text(arrays, field, [getattr(task, field) for task in tasks])
+    _encode_text(arrays, 'extra', [
+        json.dumps(task.extra, ensure_ascii=False, default=str) if task.extra else None for task in tasks
+    ])
+
+    # 檢查項目攤平成一維，以每個任務的項目數切分
+    items = [item for task in tasks for item in task.checklist]
+    arrays['next_item_id'] = np.fromiter((task.next_item_id for task in tasks), dtype=np.int64, count=count)
+    arrays['checklist__counts'] = np.fromiter((len(task.checklist) for task in tasks), dtype=np.int32, count=count)
+    arrays['checklist__completed'] = np.fromiter((item.completed for item in items), dtype=bool, count=len(items))
+    arrays['checklist__id'] = np.fromiter((item.id for item in items), dtype=np.int64, count=len(items))
+    _encode_text(arrays, 'checklist__item', [item.item for item in items])
+
+    # 前置任務同樣攤平保存
+    arrays['predecessors__counts'] = np.fromiter((len(task.predecessors) for task in tasks), dtype=np.int32, count=count)
+    arrays['predecessors__id'] = np.fromiter(
+        (task_id for task in tasks for task_id in task.predecessors), dtype=np.int64,
+    )
+    return arrays
+
+
+def decode(arrays):
+    """由欄位式陣列批次重建任務"""
+    columns = {field: _decode_codes(arrays, field) for field in CODED_FIELDS}
+    columns.update((field, _decode_text(arrays, field)) for field in TEXT_FIELDS)
+    ids = arrays['id'].tolist()
+    starts = _decode_dates(arrays['start'])
+    finishes = _decode_dates(arrays['finish'])
+    progress = [int(value) if value.is_integer() else value for value in arrays['progress'].tolist()]
+    versions = [None if value < 0 else value for value in arrays['version'].tolist()]
+    extras = _decode_text(arrays, 'extra')
+
+    items = [
+        ChecklistItem(item, completed, item_id)
+        for item, completed, item_id in zip(
+            _decode_text(arrays, 'checklist__item'),
+            arrays['checklist__completed'].tolist(),
+            arrays['checklist__id'].tolist(),
+        )
+    ]
+    bounds = np.concatenate(([0], np.cumsum(arrays['checklist__counts']))).tolist()
+    next_item_ids = arrays['next_item_id'].tolist()
+    links = arrays['predecessors__id'].tolist()
+    link_bounds = np.concatenate(([0], np.cumsum(arrays['predecessors__counts']))).tolist()
+
+    tasks = []
+    rows = zip(
+        ids, columns['name'], starts, finishes, columns['category'], columns['status'], columns['notes'],
+        progress, columns['created_by'], columns['created_at'], columns['last_modified'], versions, extras,
+    )
+    for i, row in enumerate(rows):
+        task = Task.__new__(Task)
+        (task.id, task.name, task.start, task.finish, task.category, task.status, task.notes,
+         task.progress, task.created_by, task.created_at, task.last_modified, task.version, extra) = row
+        task.checklist = items[bounds[i]:bounds[i + 1]]
+        task.next_item_id = next_item_ids[i]
+        task.predecessors = tuple(links[link_bounds[i]:link_bounds[i + 1]])
+        task.extra = json.loads(extra) if extra is not None else None
+        tasks.append(task)
+    return tasks
+
+
+def stage_snapshot(path, tasks, stamp):
+    """把二進位快照寫入 path 旁的暫存檔並 fsync，回傳暫存檔路徑（由呼叫端替換）"""
+    arrays = encode(tasks, stamp)
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tasks-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_snapshot(path, tasks, stamp):
+    """原子寫入二進位快照（不壓縮，讀取時不必解壓）"""
+    tmp_path = stage_snapshot(path, tasks, stamp)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path, stamp):
+    """讀取二進位快照；與 JSON 檔不一致（或格式不符）時回傳 None"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        if int(npz['format'][0]) != FORMAT or tuple(npz['stamp'].tolist()) != tuple(stamp):
+            return None
+        arrays = {name: npz[name] for name in npz.files}
+    # 不暫停垃圾回收：那是整個行程的設定，會影響同時服務其他 session 的執行緒
+    return decode(arrays)
@@ -0,0 +1,339 @@
+# utils/sqlite_handler.py
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, date
+from utils.data_handler import Task, VersionConflict, check_version
+from utils.task_collection import TaskCollection
+
+# 任務欄位與資料表欄位的對應，其餘欄位存放在 extra(JSON)
+COLUMNS = {
+    'Task': 'task',
+    'Start': 'start',
+    'Finish': 'finish',
+    'Category': 'category',
+    'Status': 'status',
+    'Notes': 'notes',
+    'Progress': 'progress',
+    'Created_by': 'created_by',
+    'Created_at': 'created_at',
+    'last_modified': 'last_modified',
+    'version': 'version',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    start TEXT NOT NULL,
+    finish TEXT NOT NULL,
+    category TEXT,
+    status TEXT,
+    notes TEXT,
+    progress REAL,
+    created_by TEXT,
+    created_at TEXT,
+    last_modified TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS checklist (
+    task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    item_id INTEGER,
+    item TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (task_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks(category);
+CREATE INDEX IF NOT EXISTS idx_tasks_start ON tasks(start, finish);
+CREATE INDEX IF NOT EXISTS idx_tasks_finish ON tasks(finish);
+"""
+
+
+class SQLiteDataHandler:
+    """SQLite 版的數據處理器
+
+    寫入介面與 DataHandler 相同：新任務的 id 避開資料庫中已有的 id，
+    更新與刪除以任務的 version 做樂觀並行控制（衝突時拋出
+    VersionConflict），可搭配 WriteBehind 使用。變更通知
+    （change_version、changes_since）、檔案狀態與日誌模式只有 JSON 版
+    提供，行程層級的任務快取與共用圖表仍需使用 DataHandler。
+    """
+
+    def __init__(self, file_path="data/tasks.db"):
+        self.file_path = file_path
+        self.ensure_data_directory()
+        with closing(self.connect()) as conn:
+            conn.executescript(SCHEMA)
+            # 舊資料庫補上檢查項目 id 欄位（缺少 id 的項目讀取時依位置補上）
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(checklist)")}
+            if 'item_id' not in columns:
+                conn.execute("ALTER TABLE checklist ADD COLUMN item_id INTEGER")
+            # 舊資料庫補上版本欄位（先前的版本號存放在 extra）
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+            if 'version' not in columns:
+                conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                conn.execute(
+                    "UPDATE tasks SET version = COALESCE(json_extract(extra, '$.version'), 1), "
+                    "extra = json_remove(extra, '$.version') WHERE extra IS NOT NULL"
+                )
+            conn.commit()
+
+    def ensure_data_directory(self):
+        """確保數據目錄存在"""
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def connect(self):
+        """建立連線（Streamlit 每次重跑可能在不同線程，連線不共用）"""
+        conn = sqlite3.connect(self.file_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def date_handler(self, obj):
+        """處理日期序列化"""
+        if isinstance(obj, (date, datetime)):
+            return obj.isoformat()
+        return obj
+
+    def _row_values(self, task):
+        """把任務轉成 tasks 表的一列"""
+        values = [task['id']]
+        for key in COLUMNS:
+            values.append(self.date_handler(task.get(key)))
+        # 沒有版本的任務（如匯入的舊數據）從 1 開始
+        values[list(COLUMNS).index('version') + 1] = task.get('version') or 1
+        extra = {k: v for k, v in task.items() if k not in COLUMNS and k not in ('id', 'Checklist')}
+        values.append(json.dumps(extra, ensure_ascii=False, default=self.date_handler) if extra else None)
+        return values
+
+    def _write_task(self, conn, task):
+        """寫入（覆蓋）單一任務及其檢查項目"""
+        placeholders = ', '.join('?' * (len(COLUMNS) + 2))
+        conn.execute(
+            f"INSERT OR REPLACE INTO tasks (id, {', '.join(COLUMNS.values())}, extra) VALUES ({placeholders})",
+            self._row_values(task),
+        )
+        self._write_checklist(conn, task['id'], task.get('Checklist', []))
+
+    def _write_checklist(self, conn, task_id, checklist):
+        """重寫單一任務的檢查項目"""
+        conn.execute("DELETE FROM checklist WHERE task_id = ?", (task_id,))
+        conn.executemany(
+            "INSERT INTO checklist (task_id, position, item_id, item, completed) VALUES (?, ?, ?, ?, ?)",
+            [(task_id, i, item['id'], item['item'], int(item['completed'])) for i, item in enumerate(checklist)],
+        )
+
+    def _fetch(self, where="", params=()):
+        """依條件查詢任務並組回 Task"""
+        with closing(self.connect()) as conn:
+            return self._select(conn, where, params)
+
+    def _select(self, conn, where="", params=()):
+        """在指定連線上查詢任務（寫入前在同一交易內讀取用）"""
+        rows = conn.execute(f"SELECT * FROM tasks {where} ORDER BY id", params).fetchall()
+        if not rows:
+            return TaskCollection()
+        ids = [row['id'] for row in rows]
+        checklists = {task_id: [] for task_id in ids}
+        # 分批查詢檢查項目，避免超過 SQLite 參數上限
+        for i in range(0, len(ids), 900):
+            batch = ids[i:i + 900]
+            for item in conn.execute(
+                f"SELECT task_id, item_id, item, completed FROM checklist "
+                f"WHERE task_id IN ({', '.join('?' * len(batch))}) ORDER BY task_id, position",
+                batch,
+            ):
+                checklists[item['task_id']].append(
+                    {'id': item['item_id'], 'item': item['item'], 'completed': bool(item['completed'])}
+                )
+        return TaskCollection(self._to_task(row, checklists[row['id']]) for row in rows)
+
+    def _current(self, conn, task_id):
+        """交易內取得資料庫中的任務"""
+        return self._select(conn, "WHERE id = ?", (task_id,)).get(task_id)
+
+    def _to_task(self, row, checklist):
+        """資料列轉回任務"""
+        task = {'id': row['id']}
+        for key, column in COLUMNS.items():
+            if row[column] is not None:
+                task[key] = row[column]
+        task['Checklist'] = checklist
+        if row['extra']:
+            task.update({k: v for k, v in json.loads(row['extra']).items() if k not in task})
+        return Task.from_dict(task)
+
+    def save_tasks(self, tasks):
+        """以整份任務清單覆蓋資料庫"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM checklist")
+            conn.execute("DELETE FROM tasks")
+            for task in tasks:
+                self._write_task(conn, task)
+
+    def load_tasks(self):
+        """從資料庫加載任務數據"""
+        try:
+            return self._fetch()
+        except Exception as e:
+            print(f"加載數據時出錯: {e}")
+            return TaskCollection()
+
+    def add_task(self, tasks, new_task):
+        """添加新任務並保存（id 取資料庫與 session 中較大者，避免跨行程重複）"""
+        new_task = Task.from_dict(new_task)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if new_task.get('id') is None or self._current(conn, new_task['id']) is not None:
+                (last,) = conn.execute("SELECT MAX(id) FROM tasks").fetchone()
+                new_task['id'] = max(last + 1 if last is not None else 0, tasks.next_id())
+            new_task['version'] = 1
+            self._write_task(conn, new_task)
+        tasks.add(new_task)
+        return tasks
+
+    def update_task(self, tasks, task_id, updates, base=None):
+        """更新任務並保存（只寫入有變更的欄位）
+
+        版本檢查與合併規則與 DataHandler.update_task 相同。
+        """
+        session_task = tasks.get(task_id)
+        expected = (base or session_task or {}).get('version', 0)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current = self._current(conn, task_id)
+            if current is None:
+                raise VersionConflict(task_id)
+            check_version(task_id, current, updates, base, expected)
+            self._apply_update(conn, current, task_id, updates)
+        if session_task is not None:
+            tasks.replace(task_id, current)
+        return tasks
+
+    def _apply_update(self, conn, current, task_id, updates):
+        """交易內寫入更新並遞增版本，current 同時更新為保存後的內容"""
+        updates = dict(
+            updates,
+            version=current.get('version', 0) + 1,
+            last_modified=datetime.now().isoformat(),
+        )
+        columns = {COLUMNS[k]: self.date_handler(v) for k, v in updates.items() if k in COLUMNS}
+        extra = {k: v for k, v in updates.items() if k not in COLUMNS and k not in ('id', 'Checklist')}
+        if extra:
+            row = conn.execute("SELECT extra FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            merged = json.loads(row['extra']) if row and row['extra'] else {}
+            merged.update(extra)
+            columns['extra'] = json.dumps(merged, ensure_ascii=False, default=self.date_handler)
+        conn.execute(
+            f"UPDATE tasks SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+            [*columns.values(), task_id],
+        )
+        if 'Checklist' in updates:
+            self._write_checklist(conn, task_id, updates['Checklist'])
+        current.update(updates)
+        return current
+
+    def update_checklist(self, tasks, task_id, changes):
+        """以項目 id 把一組檢查項目變更套用到資料庫中的內容，單一交易寫入"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current = self._current(conn, task_id)
+            if current is None:
+                raise VersionConflict(task_id)
+            # 項目 id 計數存放在 extra，與檢查項目在同一交易更新
+            self._apply_update(conn, current, task_id, changes.updates(current))
+        if task_id in tasks:
+            tasks.replace(task_id, current)
+        return tasks
+
+    def delete_task(self, tasks, task_id, expected_version=None):
+        """刪除任務並保存"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is not None:
+                if expected_version is not None and row['version'] != expected_version:
+                    raise VersionConflict(task_id, self._current(conn, task_id))
+                conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        tasks.remove(task_id)
+        return tasks
+
+    def write_batch(self, ops):
+        """在單一交易中保存一批變更，規則與回傳值同 DataHandler.write_batch"""
+        results, renamed = [], {}
+        with closing(self.connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (last,) = conn.execute("SELECT MAX(id) FROM tasks").fetchone()
+            next_free = last + 1 if last is not None else 0
+            for op in ops:
+                kind = op[0]
+                if kind == 'add':
+                    _, new_task, next_id = op
+                    new_task = Task.from_dict(new_task)
+                    original = new_task.get('id')
+                    if original is None or conn.execute("SELECT 1 FROM tasks WHERE id = ?", (original,)).fetchone():
+                        new_task['id'] = max(next_free, next_id)
+                        if original is not None:
+                            renamed[original] = new_task['id']
+                    new_task['version'] = 1
+                    self._write_task(conn, new_task)
+                    next_free = max(next_free, new_task['id'] + 1)
+                    results.append(new_task)
+                    continue
+                task_id = renamed.get(op[1], op[1])
+                if kind == 'update':
+                    _, _, updates, base = op
+                    current = self._current(conn, task_id)
+                    try:
+                        if current is None:
+                            raise VersionConflict(task_id)
+                        check_version(task_id, current, updates, base, (base or {}).get('version', 0))
+                    except VersionConflict as e:
+                        results.append(e)
+                        continue
+                    results.append(self._apply_update(conn, current, task_id, updates))
+                else:
+                    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                    results.append(None)
+        return results
+
+    # ---- 索引查詢 ----
+
+    def get_task(self, task_id):
+        """依 id 取得單一任務"""
+        return self._fetch("WHERE id = ?", (task_id,)).get(task_id)
+
+    def tasks_by_status(self, status):
+        """取得指定狀態的任務"""
+        return self._fetch("WHERE status = ?", (status,))
+
+    def tasks_by_category(self, category):
+        """取得指定類別的任務"""
+        return self._fetch("WHERE category = ?", (category,))
+
+    def tasks_in_range(self, start, end):
+        """取得與日期區間 [start, end] 重疊的任務"""
+        return self._fetch(
+            "WHERE start <= ? AND finish >= ?",
+            (self.date_handler(end), self.date_handler(start)),
+        )
+
+    def count_by_status(self):
+        """各狀態的任務數"""
+        with closing(self.connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    def count_by_category(self):
+        """各類別的任務數"""
+        with closing(self.connect()) as conn:
+            return dict(conn.execute("SELECT category, COUNT(*) FROM tasks GROUP BY category").fetchall())
+
+    def import_json(self, json_handler):
+        """從 JSON 數據處理器匯入現有任務"""
+        # JSON 無法解析時中止，不以空集合覆蓋資料庫
+        self.save_tasks(json_handler.read_tasks())
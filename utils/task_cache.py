@@ -0,0 +1,188 @@
+# utils/task_cache.py
+import copy
+from contextlib import contextmanager
+import threading
+from utils.data_handler import DataLoadError
+from utils.task_collection import TaskCollection
+
+# 行程層級的任務快取：所有 session 共用同一份唯讀任務清單
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_tasks(data_handler):
+    """取得共用任務集合與其變更版本
+
+    檔案未變更時直接回傳快取；變更來自本行程的寫入時，依變更通知只
+    更新有異動的任務，其餘情況（如其他行程寫入）才整份重新解析。
+    """
+    with _lock:
+        stat = data_handler.stat_key()
+        cached = _cache.get(data_handler.file_path)
+        if cached is not None and cached[0] == stat:
+            return cached[2], cached[1]
+        version = data_handler.change_version
+        changed = data_handler.changes_since(cached[1]) if cached is not None else None
+        disk = data_handler.disk_view() if changed is not None else None
+        if disk is not None:
+            # 產生新的集合再替換，正在讀取舊集合的 session 不受影響
+            tasks = cached[2].copy()
+            for task_id in changed:
+                task = disk.get(task_id)
+                if task is None:
+                    tasks.remove(task_id)
+                else:
+                    tasks.add(copy.deepcopy(task))
+        else:
+            try:
+                tasks = data_handler.read_tasks()
+            except DataLoadError as e:
+                # 數據檔無法解析時沿用上一份內容，檔案修正後再重新載入
+                print(f"加載數據時出錯: {e}")
+                if cached is not None:
+                    return cached[2], cached[1]
+                return TaskCollection(), version
+            if cached is not None and version == cached[1]:
+                # 檔案被繞過 DataHandler 改動（版本未遞增），通知各 session 整份重新同步
+                version = data_handler.record_change()
+        _cache[data_handler.file_path] = (stat, version, tasks)
+        return tasks, version
+
+
+class SessionTasks(TaskCollection):
+    """管理員 session 的任務集合，任務本身與快取共用，寫入時才複製
+
+    同時記錄尚未保存的新增、修改與刪除，供寫入延遲層批次保存。
+    """
+
+    def __init__(self, tasks=()):
+        self._owned = set()
+        self._base = {}
+        self._added = set()
+        self._modified = set()
+        self._removed = set()
+        self._tracking = False
+        if isinstance(tasks, TaskCollection):
+            # 直接沿用共用集合的統計與索引，不必逐筆重建
+            super().__init__()
+            self._adopt(tasks)
+        else:
+            super().__init__(tasks)
+        self._tracking = True
+
+    def writable(self, task_id):
+        """寫入前複製單一任務（copy-on-write），並替換集合中的參照"""
+        task = self.get(task_id)
+        if task is not None and task_id not in self._owned:
+            # 保留修改前的共用任務，作為保存時比對與合併的基準
+            self._base[task_id] = task
+            task = self.replace(task_id, copy.deepcopy(task))
+            self._owned.add(task_id)
+        if task is not None and self._tracking and task_id not in self._added:
+            self._modified.add(task_id)
+        # 呼叫端會直接修改任務，先遞增版本並標記統計待重算
+        self.touch(task_id)
+        return task
+
+    def update(self, task_id, updates):
+        """更新前先取得自己的副本，不修改共用任務"""
+        if self.writable(task_id) is None:
+            return None
+        return super().update(task_id, updates)
+
+    def add(self, task):
+        task = super().add(task)
+        if self._tracking:
+            self._owned.add(task['id'])
+            self._added.add(task['id'])
+            self._removed.discard(task['id'])
+        return task
+
+    def remove(self, task_id):
+        task = super().remove(task_id)
+        if task is not None and self._tracking:
+            if task_id in self._added:
+                self._added.discard(task_id)
+            else:
+                self._removed.add(task_id)
+            self._modified.discard(task_id)
+        return task
+
+    @property
+    def has_changes(self):
+        """是否有尚未保存的變更"""
+        return bool(self._added or self._modified or self._removed)
+
+    def base(self, task_id):
+        """任務修改前的內容"""
+        return self._base.get(task_id)
+
+    def take_changes(self):
+        """取出並清除待保存的變更：(新增 id, 修改 id, 刪除 id)"""
+        changes = (sorted(self._added), sorted(self._modified), sorted(self._removed))
+        self._added, self._modified, self._removed = set(), set(), set()
+        return changes
+
+    def pending(self, task_id):
+        """任務是否有尚未保存（或保存後又修改）的本地變更"""
+        return (
+            task_id in self._owned or task_id in self._added
+            or task_id in self._modified or task_id in self._removed
+        )
+
+    def discard_changes(self, task_id):
+        """放棄任務的本地變更（保存衝突時改用檔案上的內容）"""
+        self._added.discard(task_id)
+        self._modified.discard(task_id)
+        self._removed.discard(task_id)
+        self.committed(task_id)
+
+    def rename(self, old_id, new_id):
+        """保存時任務被重新分配 id，連同本地變更的標記一起搬移"""
+        task = self.get(old_id)
+        if task is None:
+            return None
+        owned, modified = old_id in self._owned, old_id in self._modified
+        base = self._base.pop(old_id, None)
+        self.discard_changes(old_id)
+        tracking, self._tracking = self._tracking, False
+        try:
+            super().remove(old_id)
+            task['id'] = new_id
+            super().add(task)
+        finally:
+            self._tracking = tracking
+        if owned:
+            self._owned.add(new_id)
+        if modified:
+            self._modified.add(new_id)
+        if base is not None:
+            self._base[new_id] = base
+        return task
+
+    def committed(self, task_id):
+        """任務已保存，目前內容成為新的比對基準"""
+        self._base.pop(task_id, None)
+        self._owned.discard(task_id)
+
+    def apply_changes(self, source, task_ids):
+        """以共用集合中的最新內容更新指定任務（本地尚未保存的任務除外）"""
+        with self.untracked():
+            for task_id in task_ids:
+                if task_id in self._added or task_id in self._modified:
+                    continue
+                task = source.get(task_id)
+                if task is None:
+                    self.remove(task_id)
+                else:
+                    self.add(task)
+                self.committed(task_id)
+
+    @contextmanager
+    def untracked(self):
+        """期間的變更不列入待保存（保存流程自身的更新用）"""
+        self._tracking = False
+        try:
+            yield
+        finally:
+            self._tracking = True
@@ -0,0 +1,220 @@
+# utils/task_collection.py
+from utils.aggregates import TaskAggregates
+from utils.interval_index import IntervalIndex
+from utils.schedule import Schedule
+from utils.search_index import SearchIndex
+
+
+class TaskCollection:
+    """以 id 為索引的有序任務集合，單一任務的增刪改查皆為 O(1)"""
+
+    def __init__(self, tasks=()):
+        # dict 保留插入順序，同時充當 id 索引與列表順序
+        self._tasks = {}
+        self._next_id = 0
+        # 數據版本，任何變更都會遞增，供衍生快取判斷是否失效
+        self.version = 0
+        # 增量統計：保存每個任務目前的貢獻，變更時只重算該任務
+        self._aggregates = TaskAggregates()
+        self._contrib = {}
+        self._dirty = set()
+        # 日期區間索引，第一次查詢時建立，之後隨任務變更逐筆更新
+        self._intervals = None
+        # 全文搜尋索引，同樣延後到第一次搜尋時建立
+        self._search = None
+        # 狀態/類別/建立者的篩選遮罩
+        self._facets = None
+        # 前置任務連結的要徑排程
+        self._schedule = None
+        for task in tasks:
+            self.add(task)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def __getitem__(self, index):
+        """依列表位置取得任務（支援切片）"""
+        values = list(self._tasks.values())
+        return values[index]
+
+    def copy(self):
+        """淺複製集合（任務物件共用），不必重算索引與統計"""
+        clone = TaskCollection()
+        clone._adopt(self)
+        return clone
+
+    def _adopt(self, source):
+        """沿用另一個集合的任務、統計與索引（任務物件共用）"""
+        self._tasks = dict(source._tasks)
+        self._next_id = source._next_id
+        self.version = source.version + 1
+        self._aggregates = source.aggregates.copy()
+        self._contrib = dict(source._contrib)
+        self._intervals = source._intervals.copy() if source._intervals is not None else None
+        self._search = source._search.copy() if source._search is not None else None
+        self._facets = source._facets.copy() if source._facets is not None else None
+        self._schedule = source._schedule.copy() if source._schedule is not None else None
+
+    def get(self, task_id):
+        """依 id 取得任務，不存在時回傳 None"""
+        return self._tasks.get(task_id)
+
+    def ids(self):
+        """依列表順序回傳所有任務 id"""
+        return list(self._tasks)
+
+    def next_id(self):
+        """分配新的任務 id（只增不減，刪除後也不會重複）"""
+        return self._next_id
+
+    def _flush(self):
+        """補算被直接修改過的任務"""
+        if self._dirty:
+            for task_id in self._dirty:
+                self._recount(task_id)
+            self._dirty.clear()
+
+    @property
+    def aggregates(self):
+        """專案統計（先補算被直接修改過的任務）"""
+        self._flush()
+        return self._aggregates
+
+    @property
+    def intervals(self):
+        """任務日期區間索引"""
+        self._flush()
+        if self._intervals is None:
+            self._intervals = IntervalIndex((task.id, task.start, task.finish) for task in self._tasks.values())
+        return self._intervals
+
+    def overlapping(self, start, end):
+        """與日期區間 [start, end] 重疊的任務，依開始日期排序"""
+        return [self._tasks[task_id] for task_id in self.intervals.overlapping(start, end)]
+
+    def active_on(self, day):
+        """指定日期進行中的任務"""
+        return self.overlapping(day, day)
+
+    @property
+    def search_index(self):
+        """任務名稱、注意事項與檢查項目的全文索引"""
+        self._flush()
+        if self._search is None:
+            self._search = SearchIndex(self._tasks.values())
+        return self._search
+
+    def search(self, query, limit=None):
+        """全文搜尋任務，依相關度排序"""
+        return [self._tasks[task_id] for task_id in self.search_index.search(query, limit)]
+
+    @property
+    def facets(self):
+        """狀態、類別與建立者的篩選索引"""
+        self._flush()
+        if self._facets is None:
+            # 篩選索引需要 numpy，第一次篩選時才載入
+            from utils.facet_index import FacetIndex
+
+            self._facets = FacetIndex(self._tasks.values())
+        return self._facets
+
+    def select(self, filters):
+        """依欄位篩選任務，filters 為 {欄位: [值, ...]}"""
+        return [self._tasks[task_id] for task_id in self.facets.select(filters)]
+
+    @property
+    def schedule(self):
+        """依前置任務連結計算的要徑排程"""
+        self._flush()
+        if self._schedule is None:
+            self._schedule = Schedule(self._tasks.values())
+        return self._schedule
+
+    def _recount(self, task_id):
+        """以任務目前內容更新其統計貢獻與索引"""
+        old = self._contrib.pop(task_id, None)
+        if old is not None:
+            self._aggregates.remove(old)
+        task = self._tasks.get(task_id)
+        if task is not None:
+            self._contrib[task_id] = TaskAggregates.contribution(task)
+            self._aggregates.add(self._contrib[task_id])
+        if self._intervals is not None:
+            if task is None:
+                self._intervals.remove(task_id)
+            else:
+                self._intervals.add(task_id, task.start, task.finish)
+        if self._search is not None:
+            if task is None:
+                self._search.remove(task_id)
+            else:
+                self._search.add(task)
+        if self._facets is not None:
+            if task is None:
+                self._facets.remove(task_id)
+            else:
+                self._facets.add(task)
+        if self._schedule is not None:
+            if task is None:
+                self._schedule.remove(task_id)
+            else:
+                self._schedule.add(task)
+
+    def touch(self, task_id=None):
+        """標記集合已變更（任務物件被直接修改時呼叫，可指定任務 id）"""
+        self.version += 1
+        if task_id is not None:
+            self._dirty.add(task_id)
+
+    def add(self, task):
+        """加入任務；未指定 id 時自動分配"""
+        if task.id is None:
+            task.id = self._next_id
+        self._tasks[task.id] = task
+        if isinstance(task.id, int) and task.id >= self._next_id:
+            self._next_id = task.id + 1
+        self._recount(task.id)
+        self.version += 1
+        return task
+
+    def extend(self, tasks):
+        """批次加入任務"""
+        for task in tasks:
+            self.add(task)
+
+    def update(self, task_id, updates):
+        """更新任務欄位，回傳更新後的任務"""
+        task = self._tasks.get(task_id)
+        if task is not None:
+            task.update(updates)
+            self._recount(task_id)
+            self.version += 1
+        return task
+
+    def replace(self, task_id, task):
+        """以新物件取代任務，保留原本的位置"""
+        if task_id in self._tasks:
+            self._tasks[task_id] = task
+            self._recount(task_id)
+            self.version += 1
+        return task
+
+    def remove(self, task_id):
+        """刪除任務，回傳被刪除的任務"""
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._recount(task_id)
+            self._dirty.discard(task_id)
+            self.version += 1
+        return task
+
+    def to_list(self):
+        """轉成任務列表（序列化或建立 DataFrame 用）"""
+        return list(self._tasks.values())
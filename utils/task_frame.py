@@ -0,0 +1,35 @@
+# utils/task_frame.py
+import pandas as pd
+
+from utils.aggregates import STATUSES
+FRAME_COLUMNS = ['id', 'Task', 'Start', 'Finish', 'Category', 'Status', 'Created_by']
+
+
+def build_task_frame(tasks):
+    """把任務集合轉成欄位式 DataFrame（日期、類別型欄位與檢查項目進度）"""
+    records = [[task.get(column) for column in FRAME_COLUMNS] for task in tasks]
+    df = pd.DataFrame.from_records(records, columns=FRAME_COLUMNS)
+    df['Start'] = pd.to_datetime(df['Start'])
+    df['Finish'] = pd.to_datetime(df['Finish'])
+    extra = [status for status in df['Status'].dropna().unique() if status not in STATUSES]
+    df['Status'] = pd.Categorical(df['Status'], categories=STATUSES + extra)
+    df['Category'] = df['Category'].astype('category')
+    df['Created_by'] = df['Created_by'].astype('category')
+    df['checklist_total'] = [len(task.get('Checklist') or ()) for task in tasks]
+    df['checklist_done'] = [
+        sum(1 for item in task.get('Checklist') or () if item['completed'])
+        for task in tasks
+    ]
+    total = df['checklist_total'].where(df['checklist_total'] > 0)
+    df['progress'] = (df['checklist_done'] / total * 100).fillna(0.0)
+    return df
+
+
+def task_frame(tasks):
+    """取得任務集合的 DataFrame，依集合版本快取（共用集合即共用同一份）"""
+    cached = getattr(tasks, '_frame', None)
+    if cached is not None and cached[0] == tasks.version:
+        return cached[1]
+    df = build_task_frame(tasks)
+    tasks._frame = (tasks.version, df)
+    return df
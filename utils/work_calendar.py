@@ -0,0 +1,99 @@
+# utils/work_calendar.py
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from utils.data_handler import to_date
+
+# 預設每週工作日（週一到週五），依序為週一到週日
+DEFAULT_WEEKMASK = '1111100'
+WEEKDAY_NAMES = ['週一', '週二', '週三', '週四', '週五', '週六', '週日']
+
+# date.toordinal() 與 datetime64[D] 的差距（1970-01-01 的序數）
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_ONE_DAY = np.timedelta64(1, 'D')
+
+# 任務集合的日期欄位與工作天數（只含開始、結束日期皆有的任務）
+TaskDays = namedtuple('TaskDays', ['ids', 'starts', 'finishes', 'days'])
+
+
+class WorkCalendar:
+    """專案工作日曆：每週工作日加上假日清單
+
+    工作天數、完成日與計畫進度都以 NumPy 的工作日函式對整個日期陣列
+    計算（datetime64[D]），結束日期含當日。
+    """
+
+    def __init__(self, weekmask=DEFAULT_WEEKMASK, holidays=()):
+        self.weekmask = weekmask
+        self.holidays = tuple(sorted({to_date(day) for day in holidays if day}))
+        # 每週至少要有一個工作日，否則 numpy 會拋出 ValueError
+        self._calendar = np.busdaycalendar(
+            weekmask=weekmask, holidays=np.array(self.holidays, dtype='datetime64[D]'),
+        )
+
+    @property
+    def key(self):
+        """日曆內容，作為衍生快取的鍵"""
+        return self.weekmask, self.holidays
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('weekmask', DEFAULT_WEEKMASK), data.get('holidays', ()))
+
+    def to_dict(self):
+        return {'weekmask': self.weekmask, 'holidays': [day.isoformat() for day in self.holidays]}
+
+    def working_days(self, starts, finishes):
+        """[開始, 結束]（含兩端）之間的工作天數"""
+        finishes = np.asarray(finishes, dtype='datetime64[D]')
+        return np.busday_count(np.asarray(starts, dtype='datetime64[D]'), finishes + _ONE_DAY, busdaycal=self._calendar)
+
+    def finish_dates(self, starts, days):
+        """由開始日起做 days 個工作天的完成日（開始日不是工作日時順延）"""
+        starts = np.asarray(starts, dtype='datetime64[D]')
+        return np.busday_offset(starts, np.maximum(days, 1) - 1, roll='forward', busdaycal=self._calendar)
+
+    def elapsed_days(self, starts, finishes, day):
+        """到 day（含）為止已經過的工作天數，不超過各任務的工作天數"""
+        starts = np.asarray(starts, dtype='datetime64[D]')
+        ends = np.minimum(np.asarray(finishes, dtype='datetime64[D]'), np.datetime64(day, 'D')) + _ONE_DAY
+        return np.busday_count(starts, np.maximum(ends, starts), busdaycal=self._calendar)
+
+    def is_working_day(self, days):
+        return np.is_busday(np.asarray(days, dtype='datetime64[D]'), busdaycal=self._calendar)
+
+
+def _dates(ordinals):
+    """日期序數陣列轉成 datetime64[D]"""
+    return (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def task_days(tasks, calendar):
+    """任務集合的日期陣列與工作天數，依 (集合版本, 日曆) 快取"""
+    key = (tasks.version, calendar.key)
+    cached = getattr(tasks, '_workdays', None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    dated = [task for task in tasks if task.start is not None and task.finish is not None]
+    count = len(dated)
+    starts = _dates(np.fromiter((task.start.toordinal() for task in dated), dtype=np.int64, count=count))
+    finishes = _dates(np.fromiter((task.finish.toordinal() for task in dated), dtype=np.int64, count=count))
+    starts, finishes = np.minimum(starts, finishes), np.maximum(starts, finishes)
+    days = TaskDays([task.id for task in dated], starts, finishes, calendar.working_days(starts, finishes))
+    tasks._workdays = (key, days)
+    return days
+
+
+def plan_progress(tasks, calendar, day):
+    """依工作天計算的計畫進度：(到 day 為止應完成的工作天比例 %, 距最晚完成日的工作天數)"""
+    days = task_days(tasks, calendar)
+    total = int(days.days.sum())
+    if not total:
+        return 0.0, 0
+    day = np.datetime64(day, 'D')
+    elapsed = int(calendar.elapsed_days(days.starts, days.finishes, day).sum())
+    last = days.finishes.max()
+    remaining = int(calendar.working_days(day, last)) if last >= day else 0
+    return elapsed / total * 100, remaining
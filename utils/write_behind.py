@@ -0,0 +1,198 @@
+# utils/write_behind.py
+import atexit
+import copy
+import threading
+import time
+import weakref
+
+from utils.data_handler import DataLoadError, VersionConflict
+
+# 由保存流程維護、不需比對的欄位
+SYSTEM_FIELDS = ('id', 'version', 'last_modified')
+
+# 所有仍存活的寫入延遲層，行程結束前統一保存
+_writers = weakref.WeakSet()
+
+
+class WriteBehind:
+    """延遲寫入：收集 session 中被修改的任務，在防抖間隔後批次保存
+
+    session 的任務集合只在腳本執行緒中讀寫：flush() 在鎖內把待保存的
+    變更取出成待寫清單，防抖計時器只在背景把待寫清單寫入數據處理器，
+    保存結果（新版本、重新分配的 id、衝突）留到下一次 flush() 再套用。
+    """
+
+    def __init__(self, data_handler, tasks, interval=2.0):
+        self.data_handler = data_handler
+        self.tasks = tasks
+        self.interval = interval
+        self.conflicts = []
+        # 最近一次保存失敗的原因（數據檔無法解析時保留待寫清單，稍後重試）
+        self.error = None
+        self._since = None
+        self._timer = None
+        # 待寫清單：('add', id, 任務, 下一個 id) / ('update', id, 欄位, 基準) / ('delete', id)
+        self._outbox = []
+        # 已保存、尚未套用到 session 的結果
+        self._results = []
+        # 保存時被重新分配的 id，供之後同一任務的寫入使用
+        self._renamed = {}
+        self._lock = threading.Lock()
+        # 同時只有一個執行緒寫入，待寫清單依序保存
+        self._io = threading.Lock()
+        _writers.add(self)
+
+    @property
+    def pending(self):
+        """是否還有尚未保存的變更"""
+        return bool(self._outbox) or self.tasks.has_changes
+
+    def flush(self, force=False):
+        """保存待寫入的變更；未到防抖間隔時改為排程稍後保存（在腳本執行緒呼叫）"""
+        with self._lock:
+            self._apply_results()
+            self._take()
+            if not self._outbox:
+                self._since = None
+                return 0
+            now = time.monotonic()
+            if self._since is None:
+                self._since = now
+            if not force and now - self._since < self.interval:
+                self._schedule(self.interval - (now - self._since))
+                return 0
+            self._since = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        written = self._drain()
+        with self._lock:
+            self._apply_results()
+        return written
+
+    def _schedule(self, delay):
+        """使用者停止操作時，由計時器在背景完成保存"""
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Timer(delay, self._drain)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _take(self):
+        """把 session 的待保存變更轉成待寫清單（需在鎖內呼叫）
+
+        取出後任務即視為已提交：之後再修改時 writable() 會另外複製，
+        待寫清單中的任務物件不會再被改動，背景寫入時不必複製。
+        """
+        tasks = self.tasks
+        added, dirty, removed = tasks.take_changes()
+        for task_id in added:
+            task = tasks.get(task_id)
+            if task is not None:
+                # 數據處理器會在新任務上設定 id 與版本，寫入的是副本
+                self._outbox.append(('add', task_id, copy.deepcopy(task), tasks.next_id()))
+                tasks.committed(task_id)
+        for task_id in dirty:
+            task, base = tasks.get(task_id), tasks.base(task_id)
+            if task is None:
+                continue
+            updates = {
+                key: value for key, value in task.items()
+                if key not in SYSTEM_FIELDS and (base is None or base.get(key) != value)
+            }
+            if updates:
+                # 沒有基準時以目前內容為準：檔案上對應欄位不同即視為衝突
+                self._outbox.append(('update', task_id, updates, base if base is not None else task))
+            tasks.committed(task_id)
+        for task_id in removed:
+            self._outbox.append(('delete', task_id))
+
+    def _drain(self):
+        """把待寫清單整批寫入數據處理器（可在背景執行緒執行，不動到 session 的集合）
+
+        整批只讀取、寫入檔案各一次（日誌模式為單次追加），大量匯入也
+        不會逐筆加鎖與 fsync。
+        """
+        with self._io:
+            with self._lock:
+                batch = list(self._outbox)
+            if not batch:
+                return 0
+            ops = []
+            for op in batch:
+                if op[0] == 'add':
+                    ops.append(('add', op[2], op[3]))
+                else:
+                    ops.append((op[0], self._renamed.get(op[1], op[1])) + op[2:])
+            try:
+                saved = self.data_handler.write_batch(ops)
+            except (DataLoadError, OSError) as e:
+                # 數據檔無法解析或寫入失敗（磁碟已滿等）時，待寫清單保留到下次
+                self.error = str(e)
+                return 0
+            self.error = None
+            results, written = [], 0
+            for op, result in zip(batch, saved):
+                if isinstance(result, VersionConflict):
+                    results.append(('conflict', op[1], result))
+                    continue
+                written += 1
+                if op[0] == 'add' and result['id'] != op[1]:
+                    # 跨行程時 id 可能已被占用，由數據處理器重新分配
+                    self._renamed[op[1]] = result['id']
+                if result is not None:
+                    results.append(('saved', op[1], result))
+            with self._lock:
+                del self._outbox[:len(batch)]
+                self._results.extend(results)
+        return written
+
+    def _apply_results(self):
+        """把背景保存的結果套用到 session 的集合（需在鎖內呼叫）"""
+        tasks, results, self._results = self.tasks, self._results, []
+        with tasks.untracked():
+            for kind, task_id, value in results:
+                if kind == 'conflict':
+                    task_id = self._renamed.get(task_id, task_id)
+                    self.conflicts.append(str(value))
+                    tasks.discard_changes(task_id)
+                    if value.current is not None:
+                        tasks.replace(task_id, value.current)
+                    else:
+                        tasks.remove(task_id)
+                    continue
+                if value['id'] != task_id:
+                    tasks.rename(task_id, value['id'])
+                    task_id = value['id']
+                # 保存後又被修改的任務保留本地內容，下次保存時再合併
+                if not tasks.pending(task_id):
+                    tasks.replace(task_id, value)
+
+    def apply_checklist(self, task_id, changes):
+        """先保存其他待寫入的變更，再以單一寫入套用一組檢查項目變更"""
+        self.flush(force=True)
+        with self._io, self._lock:
+            with self.tasks.untracked():
+                try:
+                    self.data_handler.update_checklist(self.tasks, self._renamed.get(task_id, task_id), changes)
+                except VersionConflict as e:
+                    self._results.append(('conflict', task_id, e))
+                    self._apply_results()
+                except DataLoadError as e:
+                    self.error = str(e)
+                    return
+            self.tasks.committed(task_id)
+
+    def pop_conflicts(self):
+        """取出尚未顯示的衝突訊息"""
+        conflicts, self.conflicts = self.conflicts, []
+        return conflicts
+
+
+@atexit.register
+def _flush_all():
+    """行程結束前保存所有 session 的待寫入變更"""
+    for writer in list(_writers):
+        try:
+            writer.flush(force=True)
+        except Exception as e:
+            print(f"保存數據時出錯: {e}")